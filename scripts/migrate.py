@@ -0,0 +1,25 @@
+"""Create or update the PostgreSQL schema. Run once per deploy:
+
+    python scripts/migrate.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from database import get_db
+
+
+async def main():
+    db = get_db()
+    await db.connect_to_postgres(check_schema=False)
+    try:
+        await db.migrate()
+        print("Schema is up to date")
+    finally:
+        await db.close_postgres_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,34 +1,127 @@
 import os
-from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import time
+import base64
+import hmac
+import hashlib
+from functools import lru_cache
+from types import MappingProxyType
+from datetime import timedelta
+from typing import Final, Optional, Tuple
+import orjson
+from jose import JWTError, jwk, jwt
+import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from dotenv import load_dotenv
+from cache import LRUCache
 
-load_dotenv()
+# Vercel injects the environment directly; skip the .env read on cold starts
+if not os.getenv("VERCEL"):
+    load_dotenv()
+
+# Parsed once at import so a bad value fails at startup, not on first login
+SECRET_KEY: Final = os.getenv("SECRET_KEY", "fallback-secret-key")
+ALGORITHM: Final = os.getenv("ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES: Final = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+TOKEN_CACHE_SECONDS: Final = 30
+
+_HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
 
 class AuthManager:
     def __init__(self):
-        self.secret_key = os.getenv("SECRET_KEY", "fallback-secret-key")
-        self.algorithm = os.getenv("ALGORITHM", "HS256")
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.secret_key = SECRET_KEY
+        self.algorithm = ALGORITHM
+        # Build the key object once; jose otherwise re-parses the secret per call
+        self._jwt_key = jwk.construct(self.secret_key, self.algorithm)
+        # HMAC algorithms are signed in-house with orjson; anything else goes through jose
+        self._hmac_digest = _HMAC_DIGESTS.get(self.algorithm)
+        self._hmac_key = self.secret_key.encode()
+        # The header never changes, so encode it once per manager
+        self._header_b64 = _b64url(orjson.dumps({"alg": self.algorithm, "typ": "JWT"}))
+        self.access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        self._access_token_seconds = int(self.access_token_expires.total_seconds())
+        # New hashes use Argon2id (OWASP baseline: 19 MiB, 2 passes); legacy
+        # bcrypt hashes still verify and are rehashed on login
+        self.password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+        # Successful hash checks keyed by HMAC(secret, password|hash) so the
+        # cache never holds a plaintext password
+        self._verified_passwords = LRUCache(maxsize=4096)
+        # Decoded payloads keyed by a token digest; a bearer is re-checked at
+        # most every TOKEN_CACHE_SECONDS and never served past its exp
+        self._verified_tokens = LRUCache(maxsize=10000)
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return self.pwd_context.verify(plain_password, hashed_password)
+        cache_key = hmac.new(
+            self._hmac_key,
+            plain_password.encode() + b"|" + hashed_password.encode(),
+            hashlib.sha256
+        ).digest()
+        if self._verified_passwords.get(cache_key):
+            return True
+        
+        verified = self._check_password(plain_password, hashed_password)
+        if verified:
+            self._verified_passwords.set(cache_key, True)
+        return verified
+    
+    def verify_and_update_password(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password and return a replacement hash if the stored one is outdated"""
+        if not self.verify_password(plain_password, hashed_password):
+            return False, None
+        if self.needs_rehash(hashed_password):
+            return True, self.get_password_hash(plain_password)
+        return True, None
+    
+    def needs_rehash(self, hashed_password: str) -> bool:
+        if hashed_password.startswith("$2"):
+            return True
+        return self.password_hasher.check_needs_rehash(hashed_password)
     
     def get_password_hash(self, password: str) -> str:
-        return self.pwd_context.hash(password)
+        return self.password_hasher.hash(password)
+    
+    def _check_password(self, plain_password: str, hashed_password: str) -> bool:
+        if hashed_password.startswith("$2"):
+            try:
+                return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+            except ValueError:
+                return False
+        try:
+            return self.password_hasher.verify(hashed_password, plain_password)
+        except (VerificationError, InvalidHashError):
+            return False
     
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None):
         to_encode = data.copy()
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=15)
-        to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
-        return encoded_jwt
+        # NumericDate int; saves jose the datetime -> timegm conversion
+        lifetime = int(expires_delta.total_seconds()) if expires_delta else self._access_token_seconds
+        to_encode["exp"] = int(time.time()) + lifetime
+        if self._hmac_digest is None:
+            return jwt.encode(to_encode, self._jwt_key, algorithm=self.algorithm)
+        
+        signing_input = self._header_b64 + b"." + _b64url(orjson.dumps(to_encode))
+        signature = hmac.new(self._hmac_key, signing_input, self._hmac_digest).digest()
+        return (signing_input + b"." + _b64url(signature)).decode()
     
     def verify_token(self, token: str):
-        payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        payload = self._verified_tokens.get(cache_key)
+        if payload is not None:
+            return payload
+        
+        # Read-only, since the same object is handed to every request that presents this token
+        payload = MappingProxyType(jwt.decode(token, self._jwt_key, algorithms=[self.algorithm]))
+        ttl = TOKEN_CACHE_SECONDS
+        if "exp" in payload:
+            ttl = min(ttl, payload["exp"] - time.time())
+        if ttl > 0:
+            self._verified_tokens.set(cache_key, payload, ttl=ttl)
         return payload
+
+@lru_cache(maxsize=1)
+def get_auth_manager() -> AuthManager:
+    """Process-wide AuthManager, built on first use"""
+    return AuthManager()
\ No newline at end of file
@@ -1,70 +1,335 @@
 import os
+import json
 import asyncio
-from databases import Database as AsyncDatabase
+import logging
 import asyncpg
-from typing import Optional, List
+from functools import lru_cache, partial
+from typing import AsyncIterator, Optional, List, Tuple
 from models import User, UserCreate, UserInDB, Contribution, Transfer, TransferCreate, Home, HomeCreate
-from auth import AuthManager
+from auth import get_auth_manager
+from cache import LRUCache
 from datetime import datetime
+from types import MappingProxyType
 from dotenv import load_dotenv
 
-# Load environment variables with explicit path
-env_path = os.path.join(os.path.dirname(__file__), '.env')
-load_dotenv(env_path)
+SRC_DIR = os.path.dirname(__file__)
 
-# Also try loading from current directory
-load_dotenv()
+# Load environment variables once per process; a container that already
+# provides POSTGRES_URL skips the .env reads entirely. The working-directory
+# .env is only searched when the one next to this module is missing or empty
+if "POSTGRES_URL" not in os.environ:
+    load_dotenv(os.path.join(SRC_DIR, '.env')) or load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+def _redact_url(url: str) -> str:
+    """Hide the credentials part of a connection URL"""
+    scheme, sep, rest = url.partition("://")
+    netloc, slash, path = rest.partition("/")
+    if "@" in netloc:
+        netloc = "***:***@" + netloc.rpartition("@")[2]
+    return scheme + sep + netloc + slash + path
+
+# Arbitrary key for pg_advisory_lock around schema migrations
+SCHEMA_LOCK_ID = 778899
+# Bump whenever create_tables changes something the queries depend on; a running
+# app refuses to start against an older schema instead of failing per query
+SCHEMA_VERSION = 1
+# Monthly contribution partitions are kept this far ahead of the current month
+PARTITION_MONTHS_AHEAD = 12
+USER_CACHE_SECONDS = 60
+HOME_CACHE_SECONDS = 5
+AVERAGE_CACHE_SECONDS = 3600
+
+# Returned (as a copy) when a user has no home or the stats can't be computed
+EMPTY_CONTRIBUTION_STATS = MappingProxyType({
+    "user_total": 0,
+    "average_contribution": 0,
+    "amount_to_reach_average": 0,
+    "is_above_average": False,
+    "home_members_count": 0,
+    "home_total": 0
+})
+CONTRIBUTION_BATCH_SIZE = 1000
+
+def _period_bounds(year: int, month: Optional[int] = None) -> Tuple[datetime, datetime]:
+    """Half-open [start, end) range for a month, or for the whole year without one"""
+    if not month:
+        return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    if month == 12:
+        return datetime(year, 12, 1), datetime(year + 1, 1, 1)
+    return datetime(year, month, 1), datetime(year, month + 1, 1)
+
+async def _init_connection(connection):
+    # Models carry amounts as float; let the driver decode numeric straight to float
+    await connection.set_type_codec(
+        "numeric", encoder=str, decoder=float, schema="pg_catalog", format="text"
+    )
+
+# Rows coming back from Postgres already match the model types, so hot list
+# paths build models with model_construct and skip pydantic validation. Fields
+# are read by position, so queries must select columns in the order used below
+
+def _row_to_contribution(row) -> Contribution:
+    return Contribution.model_construct(
+        id=str(row[0]),
+        username=row[1],
+        home_id=str(row[2]) if row[2] else None,
+        product_name=row[3],
+        amount=row[4],
+        description=row[5],
+        date_created=row[6]
+    )
+
+def _row_to_user(row) -> UserInDB:
+    return UserInDB.model_construct(
+        id=str(row[0]),
+        username=row[1],
+        email=row[2],
+        full_name=row[3],
+        hashed_password=row[4],
+        is_active=row[5],
+        home_id=str(row[6]) if row[6] else None
+    )
+
+def _row_to_transfer(row, **full_names) -> Transfer:
+    return Transfer.model_construct(
+        id=str(row[0]),
+        sender_username=row[1],
+        recipient_username=row[2],
+        home_id=str(row[3]),
+        amount=row[4],
+        description=row[5],
+        date_created=row[6],
+        **full_names
+    )
+
+def _row_to_contribution_dict(row) -> dict:
+    """Contribution row joined with the contributor's full_name, as the templates expect it"""
+    contribution_id, username, home_id, product_name, amount, description, date_created, user_full_name = row
+    return {
+        "id": str(contribution_id),
+        "username": username,
+        "home_id": str(home_id) if home_id else "",
+        "product_name": product_name,
+        "amount": amount,
+        "description": description,
+        "date_created": date_created,
+        "user_full_name": user_full_name
+    }
+
+# The aggregate queries are assembled from a where clause chosen by the caller;
+# each variant is built once. asyncpg prepares statements per connection keyed
+# by their text (statement_cache_size on the pool), so after the first call a
+# variant is only bound and executed, never re-parsed or re-planned
+
+@lru_cache(maxsize=None)
+def _analytics_query(where_clause: str) -> str:
+    return f"""
+        SELECT 
+            GROUPING(c.username) = 0 as is_user,
+            GROUPING(c.product_name) = 0 as is_product,
+            GROUPING(c.month_start) = 0 as is_month,
+            c.username,
+            u.full_name,
+            c.product_name,
+            c.month_start,
+            COALESCE(SUM(c.total_amount), 0) as total_amount,
+            COALESCE(SUM(c.contribution_count), 0) as count
+        FROM contribution_rollup c
+        LEFT JOIN users u ON c.username = u.username
+        {where_clause}
+        GROUP BY GROUPING SETS (
+            (),
+            (c.username, u.full_name),
+            (c.product_name),
+            (c.month_start)
+        )
+        HAVING (GROUPING(c.username) = 1 OR u.full_name IS NOT NULL)
+            AND (GROUPING(c.product_name) = 1 OR (
+                c.product_name NOT LIKE 'Fund transfer%' AND c.product_name NOT LIKE 'Fund received%'
+            ))
+        ORDER BY month_start DESC NULLS LAST, total_amount DESC
+    """
+
+@lru_cache(maxsize=None)
+def _monthly_summary_query(where_clause: str, top_n_param: int) -> str:
+    return f"""
+        SELECT is_user, is_product, username, full_name, product_name, total_amount, count
+        FROM (
+            SELECT 
+                GROUPING(c.username) = 0 as is_user,
+                GROUPING(c.product_name) = 0 as is_product,
+                c.username,
+                u.full_name,
+                c.product_name,
+                COALESCE(SUM(c.total_amount), 0) as total_amount,
+                COALESCE(SUM(c.contribution_count), 0) as count,
+                ROW_NUMBER() OVER (
+                    PARTITION BY GROUPING(c.username), GROUPING(c.product_name)
+                    ORDER BY COALESCE(SUM(c.total_amount), 0) DESC
+                ) as rank
+            FROM contribution_rollup c
+            LEFT JOIN users u ON c.username = u.username
+            WHERE {where_clause}
+            GROUP BY GROUPING SETS (
+                (),
+                (c.username, u.full_name),
+                (c.product_name)
+            )
+            HAVING (GROUPING(c.username) = 1 OR u.full_name IS NOT NULL)
+                AND (GROUPING(c.product_name) = 1 OR (
+                    c.product_name NOT LIKE 'Fund transfer%' AND c.product_name NOT LIKE 'Fund received%'
+                ))
+        ) ranked
+        WHERE ${top_n_param}::integer IS NULL OR rank <= ${top_n_param}::integer
+        ORDER BY total_amount DESC
+    """
 
 class Database:
     def __init__(self):
         self.postgres_url = os.getenv("POSTGRES_URL")
-        self.database = None
-        self.auth_manager = AuthManager()
+        self.pool = None
+        self.auth_manager = get_auth_manager()
+        # get_user runs on every authenticated request; every write to a users or
+        # home_members row must go through _forget_user. Other workers keep their copy
+        # until the TTL, so writes that depend on membership check home_members in SQL
+        self._user_cache = LRUCache(maxsize=4096, ttl=USER_CACHE_SECONDS)
+        # In-flight user loads, so a burst of misses for one name shares a single query
+        self._user_loads = {}
+        # Bumped by every user invalidation; a load that started before the bump
+        # may hold the old row, so it is returned but not cached
+        self._user_generation = 0
+        # Membership guards load the same home several times per request; keyed by
+        # int id and popped on every home_members or homes write, like _user_cache.
+        # The pops only reach this worker, so the short TTL bounds what others see
+        self._home_cache = LRUCache(maxsize=1024, ttl=HOME_CACHE_SECONDS)
+        # Contribution-to-average results keyed by (home_id, username, version of
+        # the home_aggregates row); a write bumps the version, so old entries are
+        # never read again and simply age out
+        self._average_cache = LRUCache(maxsize=4096, ttl=AVERAGE_CACHE_SECONDS)
         
-        # Debug: Print loaded environment variables (without password)
         if not self.postgres_url:
-            print("ERROR: POSTGRES_URL environment variable is not set")
-        else:
-            # Print URL without password for debugging
-            safe_url = self.postgres_url.replace(self.postgres_url.split('://')[1].split('@')[0], "***:***")
-            print(f"PostgreSQL URL loaded: {safe_url}")
+            logger.error("POSTGRES_URL environment variable is not set")
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug("PostgreSQL URL loaded: %s", _redact_url(self.postgres_url))
     
-    async def connect_to_postgres(self):
-        """Connect to PostgreSQL database"""
+    async def connect_to_postgres(self, check_schema: bool = True):
+        """Connect to PostgreSQL database; check_schema=False lets the migration script reach an old schema"""
         if not self.postgres_url:
             raise ValueError("PostgreSQL connection URL not set")
         
         try:
-            self.database = AsyncDatabase(self.postgres_url)
-            await self.database.connect()
-            print("PostgreSQL connection successful")
+            # asyncpg prepares each distinct statement once per connection and
+            # keeps it in the statement cache for reuse
+            self.pool = await asyncpg.create_pool(
+                self.postgres_url,
+                init=_init_connection,
+                min_size=5,
+                max_size=20,
+                statement_cache_size=500,
+                max_inactive_connection_lifetime=300
+            )
+            logger.info("PostgreSQL connection successful")
             
-            # Create tables if they don't exist
-            await self.create_tables()
+            # Schema changes ship through scripts/migrate.py; at startup only
+            # bootstrap a database that has never been migrated
+            if await self._fetchval("SELECT to_regclass('public.users')") is None:
+                await self.migrate()
+            elif check_schema:
+                version = await self.schema_version()
+                if version < SCHEMA_VERSION:
+                    await self.close_postgres_connection()
+                    raise RuntimeError(
+                        f"Database schema is at version {version}, expected {SCHEMA_VERSION}; "
+                        "run scripts/migrate.py"
+                    )
+                await self.ensure_partitions()
             
         except Exception as e:
-            print(f"PostgreSQL connection failed: {str(e)}")
+            logger.error("PostgreSQL connection failed: %s", e)
             raise e
 
     async def close_postgres_connection(self):
-        if self.database:
-            await self.database.disconnect()
+        if self.pool:
+            await self.pool.close()
     
     async def get_database(self):
         try:
-            if self.database is None:
+            if self.pool is None:
                 await self.connect_to_postgres()
-            return self.database
+            return self.pool
         except Exception as e:
-            print(f"Database access error: {str(e)}")
+            logger.error("Database access error: %s", e)
             raise e
     
-    async def create_tables(self):
+    # The helpers read self.pool directly once it exists and only fall back to
+    # get_database() for the lazy first connect
+    async def _fetchrow(self, query: str, *args):
+        pool = self.pool or await self.get_database()
+        return await pool.fetchrow(query, *args)
+    
+    async def _fetch(self, query: str, *args):
+        pool = self.pool or await self.get_database()
+        return await pool.fetch(query, *args)
+    
+    async def _fetchval(self, query: str, *args):
+        pool = self.pool or await self.get_database()
+        return await pool.fetchval(query, *args)
+    
+    async def _execute(self, query: str, *args) -> int:
+        """Run a statement and return the number of rows it affected"""
+        pool = self.pool or await self.get_database()
+        status = await pool.execute(query, *args)
+        # asyncpg returns the command tag, e.g. "UPDATE 3" or "INSERT 0 1"
+        count = status.rsplit(" ", 1)[-1]
+        return int(count) if count.isdigit() else 0
+    
+    async def ping(self) -> None:
+        """Round-trip a trivial query; raises if the database is unreachable"""
+        await self._fetchval("SELECT 1")
+    
+    async def schema_version(self) -> int:
+        """Version recorded by the last migration; 0 for databases migrated before versioning"""
+        if await self._fetchval("SELECT to_regclass('public.schema_version')") is None:
+            return 0
+        return await self._fetchval("SELECT version FROM schema_version") or 0
+    
+    async def ensure_partitions(self):
+        """Roll the monthly contribution partitions forward; rows past the last one land in contributions_default"""
+        async with self.pool.acquire() as connection:
+            # Workers starting together would race to create the same partition;
+            # whoever holds the lock is already doing this, so the rest skip it
+            if not await connection.fetchval("SELECT pg_try_advisory_lock($1)", SCHEMA_LOCK_ID):
+                return
+            try:
+                await connection.execute("SELECT contributions_ensure_partitions($1)", PARTITION_MONTHS_AHEAD)
+            finally:
+                await connection.execute("SELECT pg_advisory_unlock($1)", SCHEMA_LOCK_ID)
+    
+    async def migrate(self):
+        """Apply the schema in one transaction, under an advisory lock so concurrent workers don't race"""
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                # Held by the session running the DDL and released with the transaction,
+                # so a failed migration rolls back and unlocks together
+                await connection.execute("SELECT pg_advisory_xact_lock($1)", SCHEMA_LOCK_ID)
+                await self.create_tables(connection)
+                await connection.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                        version INTEGER NOT NULL
+                    )
+                """)
+                await connection.execute("""
+                    INSERT INTO schema_version (version) VALUES ($1)
+                    ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version
+                """, SCHEMA_VERSION)
+    
+    async def create_tables(self, connection):
         """Create all required tables"""
-        db = await self.get_database()
-        
         # Users table
-        await db.execute("""
+        await connection.execute("""
             CREATE TABLE IF NOT EXISTS users (
                 id SERIAL PRIMARY KEY,
                 username VARCHAR(50) UNIQUE NOT NULL,
@@ -72,13 +337,12 @@ class Database:
                 full_name VARCHAR(100) NOT NULL,
                 hashed_password VARCHAR(255) NOT NULL,
                 is_active BOOLEAN DEFAULT TRUE,
-                home_id INTEGER,
                 date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
         
         # Homes table
-        await db.execute("""
+        await connection.execute("""
             CREATE TABLE IF NOT EXISTS homes (
                 id SERIAL PRIMARY KEY,
                 name VARCHAR(100) UNIQUE NOT NULL,
@@ -88,21 +352,11 @@ class Database:
             )
         """)
         
-        # Contributions table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS contributions (
-                id SERIAL PRIMARY KEY,
-                username VARCHAR(50) NOT NULL,
-                home_id INTEGER,
-                product_name VARCHAR(200) NOT NULL,
-                amount DECIMAL(10,2) NOT NULL,
-                description TEXT,
-                date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        # Contributions table, range-partitioned by month
+        await self._create_contributions_table(connection)
         
         # Transfers table
-        await db.execute("""
+        await connection.execute("""
             CREATE TABLE IF NOT EXISTS transfers (
                 id SERIAL PRIMARY KEY,
                 sender_username VARCHAR(50) NOT NULL,
@@ -115,7 +369,7 @@ class Database:
         """)
         
         # Join requests table
-        await db.execute("""
+        await connection.execute("""
             CREATE TABLE IF NOT EXISTS join_requests (
                 id SERIAL PRIMARY KEY,
                 username VARCHAR(50) NOT NULL,
@@ -128,7 +382,7 @@ class Database:
         """)
         
         # Home members table (for tracking home membership)
-        await db.execute("""
+        await connection.execute("""
             CREATE TABLE IF NOT EXISTS home_members (
                 id SERIAL PRIMARY KEY,
                 home_id INTEGER NOT NULL,
@@ -138,412 +392,505 @@ class Database:
             )
         """)
         
+        # home_members is the only record of membership. Older databases also kept
+        # users.home_id; fold it into home_members (users.home_id wins on conflict)
+        # and drop the column
+        await connection.execute("""
+            DO $$
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_schema = 'public' AND table_name = 'users' AND column_name = 'home_id'
+                ) THEN
+                    DELETE FROM home_members hm
+                    USING users u
+                    WHERE hm.username = u.username AND hm.home_id IS DISTINCT FROM u.home_id;
+                    INSERT INTO home_members (home_id, username)
+                    SELECT home_id, username FROM users WHERE home_id IS NOT NULL
+                    ON CONFLICT DO NOTHING;
+                    ALTER TABLE users DROP COLUMN home_id CASCADE;
+                END IF;
+            END
+            $$
+        """)
+        
+        # A user belongs to at most one home
+        await connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_home_members_username ON home_members(username)")
+        
+        # Users joined with their home, for reads that need home_id
+        await connection.execute("""
+            CREATE OR REPLACE VIEW users_with_home AS
+            SELECT u.id, u.username, u.email, u.full_name, u.hashed_password, u.is_active, hm.home_id, u.date_created
+            FROM users u
+            LEFT JOIN home_members hm ON hm.username = u.username
+        """)
+        
         # Create indexes for better performance
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_contributions_username ON contributions(username)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_contributions_home_id ON contributions(home_id)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_transfers_sender ON transfers(sender_username)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_transfers_recipient ON transfers(recipient_username)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_join_requests_status ON join_requests(status)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_home_members_home_id ON home_members(home_id)")
+        # Covers the username -> full_name joins so they can be index-only scans
+        await connection.execute("CREATE INDEX IF NOT EXISTS idx_users_username_cov ON users(username) INCLUDE (full_name)")
+        await connection.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
+        # Composite indexes match the "WHERE x = ? ORDER BY date_created DESC" list queries,
+        # so Postgres can read rows in order instead of sorting them
+        await connection.execute("CREATE INDEX IF NOT EXISTS idx_contrib_user_date_cov ON contributions(username, date_created DESC) INCLUDE (home_id, amount)")
+        # Month-range summaries and home totals read only these columns, so the
+        # date-keyed indexes carry them and the aggregates run as index-only scans
+        await connection.execute("CREATE INDEX IF NOT EXISTS idx_contrib_home_date_cov ON contributions(home_id, date_created DESC) INCLUDE (username, product_name, amount)")
+        await connection.execute("CREATE INDEX IF NOT EXISTS idx_contrib_date_cov ON contributions(date_created) INCLUDE (username, product_name, amount)")
+        # Transfer history and pending join requests are read by these keys in date
+        # order; the INCLUDE lists carry the selected columns, and the partial
+        # indexes only hold requests still waiting for a decision
+        await connection.execute("CREATE INDEX IF NOT EXISTS idx_transfers_sender_date_cov ON transfers(sender_username, date_created DESC) INCLUDE (id, recipient_username, home_id, amount, description)")
+        await connection.execute("CREATE INDEX IF NOT EXISTS idx_transfers_recipient_date_cov ON transfers(recipient_username, date_created DESC) INCLUDE (id, sender_username, home_id, amount, description)")
+        await connection.execute("CREATE INDEX IF NOT EXISTS idx_join_requests_home_pending ON join_requests(home_id, date_created DESC) WHERE status = 'pending'")
+        await connection.execute("CREATE INDEX IF NOT EXISTS idx_join_requests_user_pending ON join_requests(username) WHERE status = 'pending'")
+        await connection.execute("CREATE INDEX IF NOT EXISTS idx_home_members_home_id ON home_members(home_id)")
+        
+        # Superseded by the composite and covering indexes above
+        await connection.execute("DROP INDEX IF EXISTS idx_users_username")
+        await connection.execute("DROP INDEX IF EXISTS idx_contributions_username")
+        await connection.execute("DROP INDEX IF EXISTS idx_contributions_home_id")
+        await connection.execute("DROP INDEX IF EXISTS idx_transfers_sender")
+        await connection.execute("DROP INDEX IF EXISTS idx_transfers_recipient")
+        await connection.execute("DROP INDEX IF EXISTS idx_contrib_year_month")
+        await connection.execute("DROP INDEX IF EXISTS idx_contrib_home_date")
+        await connection.execute("DROP INDEX IF EXISTS idx_contrib_date")
+        await connection.execute("DROP INDEX IF EXISTS idx_contrib_user_date")
+        await connection.execute("DROP INDEX IF EXISTS idx_transfers_sender_date")
+        await connection.execute("DROP INDEX IF EXISTS idx_transfers_recipient_date")
+        await connection.execute("DROP INDEX IF EXISTS idx_join_requests_status")
+        
+        await self._create_contribution_rollup(connection)
+        await self._create_home_aggregates(connection)
+    
+    async def _create_contributions_table(self, connection):
+        """Create contributions partitioned by month, converting an older plain table in place"""
+        await connection.execute("""
+            CREATE OR REPLACE FUNCTION contributions_ensure_partitions(months_ahead INTEGER) RETURNS void AS $$
+            DECLARE
+                bucket DATE;
+                last_bucket DATE := date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead);
+                partition_name TEXT;
+            BEGIN
+                SELECT COALESCE(date_trunc('month', MIN(date_created)), date_trunc('month', CURRENT_DATE))::date
+                INTO bucket
+                FROM contributions;
+                WHILE bucket <= last_bucket LOOP
+                    partition_name := 'contributions_' || to_char(bucket, 'YYYY_MM');
+                    IF to_regclass(partition_name) IS NULL THEN
+                        -- Rows for this month may already sit in the default partition;
+                        -- they must leave it before the month gets its own partition
+                        CREATE TEMP TABLE contributions_moving AS
+                            SELECT * FROM contributions_default
+                            WHERE date_created >= bucket AND date_created < bucket + INTERVAL '1 month';
+                        DELETE FROM contributions_default
+                        WHERE date_created >= bucket AND date_created < bucket + INTERVAL '1 month';
+                        EXECUTE format(
+                            'CREATE TABLE %I PARTITION OF contributions FOR VALUES FROM (%L) TO (%L)',
+                            partition_name, bucket, bucket + INTERVAL '1 month'
+                        );
+                        INSERT INTO contributions SELECT * FROM contributions_moving;
+                        DROP TABLE contributions_moving;
+                    END IF;
+                    bucket := bucket + INTERVAL '1 month';
+                END LOOP;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        # One implicit transaction: set aside a pre-partitioning table, create the
+        # partitioned one and copy rows across; they are then split into monthly partitions
+        await connection.execute("""
+            DO $$
+            BEGIN
+                IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('public.contributions')) = 'r' THEN
+                    ALTER TABLE contributions RENAME TO contributions_unpartitioned;
+                    ALTER TABLE contributions_unpartitioned RENAME CONSTRAINT contributions_pkey TO contributions_unpartitioned_pkey;
+                END IF;
+            END
+            $$;
+            CREATE SEQUENCE IF NOT EXISTS contributions_id_seq;
+            CREATE TABLE IF NOT EXISTS contributions (
+                id INTEGER NOT NULL DEFAULT nextval('contributions_id_seq'),
+                username VARCHAR(50) NOT NULL,
+                home_id INTEGER,
+                product_name VARCHAR(200) NOT NULL,
+                amount DECIMAL(10,2) NOT NULL,
+                description TEXT,
+                date_created TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, date_created)
+            ) PARTITION BY RANGE (date_created);
+            ALTER SEQUENCE contributions_id_seq OWNED BY contributions.id;
+            CREATE TABLE IF NOT EXISTS contributions_default PARTITION OF contributions DEFAULT;
+            DO $$
+            BEGIN
+                IF to_regclass('public.contributions_unpartitioned') IS NOT NULL THEN
+                    INSERT INTO contributions (id, username, home_id, product_name, amount, description, date_created)
+                    SELECT id, username, home_id, product_name, amount, description, COALESCE(date_created, CURRENT_TIMESTAMP)
+                    FROM contributions_unpartitioned;
+                    DROP TABLE contributions_unpartitioned;
+                END IF;
+            END
+            $$;
+        """)
+        await connection.execute("SELECT contributions_ensure_partitions($1)", PARTITION_MONTHS_AHEAD)
+    
+    async def _create_contribution_rollup(self, connection):
+        """Per home/user/product/month sums kept current by a trigger on contributions"""
+        await connection.execute("""
+            CREATE TABLE IF NOT EXISTS contribution_rollup (
+                home_id INTEGER NOT NULL,
+                username VARCHAR(50) NOT NULL,
+                product_name VARCHAR(200) NOT NULL,
+                month_start TIMESTAMP NOT NULL,
+                total_amount DECIMAL(14,2) NOT NULL,
+                contribution_count INTEGER NOT NULL,
+                PRIMARY KEY (home_id, username, product_name, month_start)
+            )
+        """)
+        # Monthly summaries filter on month_start, which the primary key leads with last
+        await connection.execute("CREATE INDEX IF NOT EXISTS idx_contribution_rollup_month ON contribution_rollup(month_start, home_id)")
+        # A member's running total only needs the amounts under (home_id, username)
+        await connection.execute("CREATE INDEX IF NOT EXISTS idx_contribution_rollup_member_cov ON contribution_rollup(home_id, username) INCLUDE (total_amount)")
+        await connection.execute("""
+            CREATE OR REPLACE FUNCTION contribution_rollup_apply() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                    UPDATE contribution_rollup
+                    SET total_amount = total_amount - OLD.amount,
+                        contribution_count = contribution_count - 1
+                    WHERE home_id = COALESCE(OLD.home_id, 0)
+                        AND username = OLD.username
+                        AND product_name = OLD.product_name
+                        AND month_start = date_trunc('month', OLD.date_created);
+                    DELETE FROM contribution_rollup
+                    WHERE home_id = COALESCE(OLD.home_id, 0)
+                        AND username = OLD.username
+                        AND product_name = OLD.product_name
+                        AND month_start = date_trunc('month', OLD.date_created)
+                        AND contribution_count <= 0;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO contribution_rollup
+                        (home_id, username, product_name, month_start, total_amount, contribution_count)
+                    VALUES
+                        (COALESCE(NEW.home_id, 0), NEW.username, NEW.product_name,
+                         date_trunc('month', NEW.date_created), NEW.amount, 1)
+                    ON CONFLICT (home_id, username, product_name, month_start) DO UPDATE
+                    SET total_amount = contribution_rollup.total_amount + EXCLUDED.total_amount,
+                        contribution_count = contribution_rollup.contribution_count + 1;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        # Install the trigger and backfill in one implicit transaction so no
+        # insert is either missed or counted twice
+        await connection.execute("""
+            LOCK TABLE contributions IN SHARE ROW EXCLUSIVE MODE;
+            DROP TRIGGER IF EXISTS contributions_rollup ON contributions;
+            CREATE TRIGGER contributions_rollup
+                AFTER INSERT OR UPDATE OR DELETE ON contributions
+                FOR EACH ROW EXECUTE FUNCTION contribution_rollup_apply();
+            TRUNCATE contribution_rollup;
+            INSERT INTO contribution_rollup
+                (home_id, username, product_name, month_start, total_amount, contribution_count)
+            SELECT COALESCE(home_id, 0), username, product_name, date_trunc('month', date_created), SUM(amount), COUNT(*)
+            FROM contributions
+            GROUP BY COALESCE(home_id, 0), username, product_name, date_trunc('month', date_created);
+        """)
+    
+    async def _create_home_aggregates(self, connection):
+        """Per-home contribution total and member count kept current by triggers"""
+        await connection.execute("""
+            CREATE TABLE IF NOT EXISTS home_aggregates (
+                home_id INTEGER PRIMARY KEY,
+                total_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+                members_count INTEGER NOT NULL DEFAULT 0,
+                version BIGINT NOT NULL DEFAULT 0
+            )
+        """)
+        # Every change is applied as a delta; version moves with each one so
+        # readers can tell whether anything derived from the row is still current
+        await connection.execute("""
+            CREATE OR REPLACE FUNCTION home_aggregates_apply(target INTEGER, amount_delta NUMERIC, members_delta INTEGER) RETURNS void AS $$
+            BEGIN
+                INSERT INTO home_aggregates (home_id, total_amount, members_count, version)
+                VALUES (target, amount_delta, members_delta, 1)
+                ON CONFLICT (home_id) DO UPDATE
+                SET total_amount = home_aggregates.total_amount + EXCLUDED.total_amount,
+                    members_count = home_aggregates.members_count + EXCLUDED.members_count,
+                    version = home_aggregates.version + 1;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        await connection.execute("""
+            CREATE OR REPLACE FUNCTION home_aggregates_contribution() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.home_id IS NOT NULL THEN
+                    PERFORM home_aggregates_apply(OLD.home_id, -OLD.amount, 0);
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.home_id IS NOT NULL THEN
+                    PERFORM home_aggregates_apply(NEW.home_id, NEW.amount, 0);
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        await connection.execute("""
+            CREATE OR REPLACE FUNCTION home_aggregates_member() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    PERFORM home_aggregates_apply(OLD.home_id, 0, -1);
+                ELSE
+                    PERFORM home_aggregates_apply(NEW.home_id, 0, 1);
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        # Same install-and-backfill transaction as the contribution rollup
+        await connection.execute("""
+            LOCK TABLE contributions, home_members IN SHARE ROW EXCLUSIVE MODE;
+            DROP TRIGGER IF EXISTS contributions_home_aggregates ON contributions;
+            CREATE TRIGGER contributions_home_aggregates
+                AFTER INSERT OR UPDATE OR DELETE ON contributions
+                FOR EACH ROW EXECUTE FUNCTION home_aggregates_contribution();
+            DROP TRIGGER IF EXISTS home_members_home_aggregates ON home_members;
+            CREATE TRIGGER home_members_home_aggregates
+                AFTER INSERT OR DELETE ON home_members
+                FOR EACH ROW EXECUTE FUNCTION home_aggregates_member();
+            CREATE TEMP TABLE home_aggregates_recount ON COMMIT DROP AS
+            SELECT home_id, SUM(total_amount) as total_amount, SUM(members_count) as members_count
+            FROM (
+                SELECT home_id, SUM(amount) as total_amount, 0 as members_count
+                FROM contributions WHERE home_id IS NOT NULL GROUP BY home_id
+                UNION ALL
+                SELECT home_id, 0, COUNT(*) FROM home_members GROUP BY home_id
+            ) totals
+            GROUP BY home_id;
+            -- Recount in place rather than truncating, so versions only ever move forward
+            UPDATE home_aggregates ag
+            SET total_amount = 0, members_count = 0, version = ag.version + 1
+            WHERE NOT EXISTS (SELECT 1 FROM home_aggregates_recount r WHERE r.home_id = ag.home_id);
+            INSERT INTO home_aggregates (home_id, total_amount, members_count, version)
+            SELECT home_id, total_amount, members_count, 1 FROM home_aggregates_recount
+            ON CONFLICT (home_id) DO UPDATE
+            SET total_amount = EXCLUDED.total_amount,
+                members_count = EXCLUDED.members_count,
+                version = home_aggregates.version + 1;
+        """)
     
     async def create_user(self, user: UserCreate) -> UserInDB:
-        db = await self.get_database()
-        
         hashed_password = self.auth_manager.get_password_hash(user.password)
         
         try:
             query = """
                 INSERT INTO users (username, email, full_name, hashed_password, is_active, date_created)
-                VALUES (:username, :email, :full_name, :hashed_password, :is_active, :date_created)
-                RETURNING id, username, email, full_name, hashed_password, is_active, home_id, date_created
+                VALUES ($1, $2, $3, $4, $5, $6)
+                RETURNING id, username, email, full_name, hashed_password, is_active, NULL::integer as home_id, date_created
             """
-            values = {
-                "username": user.username,
-                "email": user.email,
-                "full_name": user.full_name,
-                "hashed_password": hashed_password,
-                "is_active": True,
-                "date_created": datetime.utcnow()
-            }
-            
-            result = await db.fetch_one(query, values)
-            return UserInDB(
-                id=str(result["id"]),
-                username=result["username"],
-                email=result["email"],
-                full_name=result["full_name"],
-                hashed_password=result["hashed_password"],
-                is_active=result["is_active"],
-                home_id=str(result["home_id"]) if result["home_id"] else None,
-                date_created=result["date_created"]
+            result = await self._fetchrow(
+                query, user.username, user.email, user.full_name, hashed_password, True, datetime.utcnow()
             )
+            return _row_to_user(result)
         except asyncpg.UniqueViolationError:
             raise ValueError("User already exists")
     
+    def _forget_user(self, username: str):
+        """Drop a cached user after a write to their users or home_members row"""
+        self._user_generation += 1
+        self._user_cache.pop(username)
+        # Callers arriving after the write must not join a load that read the old row
+        self._user_loads.pop(username, None)
+    
     async def get_user(self, username: str) -> Optional[UserInDB]:
-        db = await self.get_database()
-        query = "SELECT * FROM users WHERE username = :username"
-        result = await db.fetch_one(query, {"username": username})
+        user = self._user_cache.get(username)
+        if user is None:
+            load = self._user_loads.get(username)
+            if load is None:
+                load = asyncio.ensure_future(self._load_and_cache_user(username))
+                self._user_loads[username] = load
+                load.add_done_callback(partial(self._release_user_load, username))
+            # Shielded so one cancelled caller does not abort the load for the others
+            user = await asyncio.shield(load)
+        return user
+    
+    def _release_user_load(self, username: str, load: asyncio.Future):
+        # Only the current entry is removed; a load replaced by _forget_user must not evict its successor
+        if self._user_loads.get(username) is load:
+            del self._user_loads[username]
+    
+    async def _load_and_cache_user(self, username: str) -> Optional[UserInDB]:
+        generation = self._user_generation
+        user = await self._load_user(username)
+        if user and generation == self._user_generation:
+            self._user_cache.set(username, user)
+        return user
+    
+    async def _load_user(self, username: str) -> Optional[UserInDB]:
+        query = "SELECT id, username, email, full_name, hashed_password, is_active, home_id, date_created FROM users_with_home WHERE username = $1"
+        result = await self._fetchrow(query, username)
         
         if result:
-            return UserInDB(
-                id=str(result["id"]),
-                username=result["username"],
-                email=result["email"],
-                full_name=result["full_name"],
-                hashed_password=result["hashed_password"],
-                is_active=result["is_active"],
-                home_id=str(result["home_id"]) if result["home_id"] else None,
-                date_created=result["date_created"]
-            )
+            return _row_to_user(result)
         return None
     
     async def get_user_by_email(self, email: str) -> Optional[UserInDB]:
-        db = await self.get_database()
-        query = "SELECT * FROM users WHERE email = :email"
-        result = await db.fetch_one(query, {"email": email})
+        query = "SELECT id, username, email, full_name, hashed_password, is_active, home_id, date_created FROM users_with_home WHERE email = $1"
+        result = await self._fetchrow(query, email)
         
         if result:
-            return UserInDB(
-                id=str(result["id"]),
-                username=result["username"],
-                email=result["email"],
-                full_name=result["full_name"],
-                hashed_password=result["hashed_password"],
-                is_active=result["is_active"],
-                home_id=str(result["home_id"]) if result["home_id"] else None,
-                date_created=result["date_created"]
-            )
+            return _row_to_user(result)
         return None
     
     async def authenticate_user(self, username: str, password: str) -> Optional[UserInDB]:
-        user = await self.get_user(username)
+        # Always check against the stored hash, never a cached copy
+        user = await self._load_user(username)
         if not user:
             return None
-        if not self.auth_manager.verify_password(password, user.hashed_password):
+        verified, new_hash = self.auth_manager.verify_and_update_password(password, user.hashed_password)
+        if not verified:
             return None
+        if new_hash:
+            # Stored hash uses an outdated cost; upgrade it now that we know the password
+            await self._execute("UPDATE users SET hashed_password = $1 WHERE username = $2", new_hash, username)
+            self._forget_user(username)
+            user.hashed_password = new_hash
         return user
     
     async def create_contribution(self, username: str, contribution_data: dict) -> Contribution:
-        db = await self.get_database()
-        
-        # Get user's home_id
-        user = await self.get_user(username)
-        if not user or not user.home_id:
-            raise ValueError("User must belong to a home to create contributions")
-        
+        # home_id comes from the membership row; no row means the user has no home
         query = """
             INSERT INTO contributions (username, home_id, product_name, amount, description, date_created)
-            VALUES (:username, :home_id, :product_name, :amount, :description, :date_created)
+            SELECT username, home_id, $2, $3, $4, $5
+            FROM home_members
+            WHERE username = $1
             RETURNING id, username, home_id, product_name, amount, description, date_created
         """
-        values = {
-            "username": username,
-            "home_id": int(user.home_id),
-            "product_name": contribution_data["product_name"],
-            "amount": contribution_data["amount"],
-            "description": contribution_data.get("description", ""),
-            "date_created": datetime.utcnow()
-        }
-        
-        result = await db.fetch_one(query, values)
-        return Contribution(
-            id=str(result["id"]),
-            username=result["username"],
-            home_id=str(result["home_id"]),
-            product_name=result["product_name"],
-            amount=float(result["amount"]),
-            description=result["description"],
-            date_created=result["date_created"]
+        result = await self._fetchrow(
+            query,
+            username,
+            contribution_data["product_name"],
+            contribution_data["amount"],
+            contribution_data.get("description", ""),
+            datetime.utcnow()
         )
+        if not result:
+            raise ValueError("User must belong to a home to create contributions")
+        return _row_to_contribution(result)
     
     async def get_user_contributions(self, username: str) -> List[Contribution]:
-        db = await self.get_database()
-        query = "SELECT * FROM contributions WHERE username = :username ORDER BY date_created DESC"
-        results = await db.fetch_all(query, {"username": username})
+        query = "SELECT id, username, home_id, product_name, amount, description, date_created FROM contributions WHERE username = $1 ORDER BY date_created DESC"
+        results = await self._fetch(query, username)
         
-        contributions = []
-        for result in results:
-            contributions.append(Contribution(
-                id=str(result["id"]),
-                username=result["username"],
-                home_id=str(result["home_id"]) if result["home_id"] else None,
-                product_name=result["product_name"],
-                amount=float(result["amount"]),
-                description=result["description"],
-                date_created=result["date_created"]
-            ))
-        
-        return contributions
+        return [_row_to_contribution(result) for result in results]
 
     async def get_home_contributions(self, home_id: str) -> List[Contribution]:
-        db = await self.get_database()
-        query = "SELECT * FROM contributions WHERE home_id = :home_id ORDER BY date_created DESC"
-        results = await db.fetch_all(query, {"home_id": int(home_id)})
+        query = "SELECT id, username, home_id, product_name, amount, description, date_created FROM contributions WHERE home_id = $1 ORDER BY date_created DESC"
+        results = await self._fetch(query, int(home_id))
         
-        contributions = []
-        for result in results:
-            contributions.append(Contribution(
-                id=str(result["id"]),
-                username=result["username"],
-                home_id=str(result["home_id"]),
-                product_name=result["product_name"],
-                amount=float(result["amount"]),
-                description=result["description"],
-                date_created=result["date_created"]
-            ))
-        
-        return contributions
+        return [_row_to_contribution(result) for result in results]
     
     async def get_all_contributions(self) -> List[Contribution]:
-        db = await self.get_database()
-        query = "SELECT * FROM contributions ORDER BY date_created DESC"
-        results = await db.fetch_all(query)
-        
-        contributions = []
-        for result in results:
-            contributions.append(Contribution(
-                id=str(result["id"]),
-                username=result["username"],
-                home_id=str(result["home_id"]) if result["home_id"] else None,
-                product_name=result["product_name"],
-                amount=float(result["amount"]),
-                description=result["description"],
-                date_created=result["date_created"]
-            ))
-        
-        return contributions
+        return [contribution async for contribution in self.iter_all_contributions()]
+    
+    async def iter_all_contributions(self) -> AsyncIterator[Contribution]:
+        """Stream every contribution through a server-side cursor, CONTRIBUTION_BATCH_SIZE rows at a time"""
+        query = "SELECT id, username, home_id, product_name, amount, description, date_created FROM contributions ORDER BY date_created DESC"
+        pool = self.pool or await self.get_database()
+        async with pool.acquire() as connection:
+            async with connection.transaction():
+                async for result in connection.cursor(query, prefetch=CONTRIBUTION_BATCH_SIZE):
+                    yield _row_to_contribution(result)
     
     async def get_all_contributions_with_users(self) -> List[dict]:
-        db = await self.get_database()
         query = """
-            SELECT c.*, u.full_name as user_full_name
+            SELECT 
+                c.id,
+                c.username,
+                c.home_id,
+                c.product_name,
+                c.amount,
+                c.description,
+                c.date_created,
+                u.full_name as user_full_name
             FROM contributions c
             JOIN users u ON c.username = u.username
             ORDER BY c.date_created DESC
         """
-        results = await db.fetch_all(query)
+        results = await self._fetch(query)
         
-        contributions = []
-        for result in results:
-            contributions.append({
-                "id": str(result["id"]),
-                "username": result["username"],
-                "home_id": str(result["home_id"]) if result["home_id"] else "",
-                "product_name": result["product_name"],
-                "amount": float(result["amount"]),
-                "description": result["description"],
-                "date_created": result["date_created"],
-                "user_full_name": result["user_full_name"]
-            })
-        
-        return contributions
+        return [_row_to_contribution_dict(result) for result in results]
 
     async def get_home_contributions_with_users(self, home_id: str) -> List[dict]:
-        db = await self.get_database()
         query = """
-            SELECT c.*, u.full_name as user_full_name
+            SELECT 
+                c.id,
+                c.username,
+                c.home_id,
+                c.product_name,
+                c.amount,
+                c.description,
+                c.date_created,
+                u.full_name as user_full_name
             FROM contributions c
             JOIN users u ON c.username = u.username
-            WHERE c.home_id = :home_id
+            WHERE c.home_id = $1
             ORDER BY c.date_created DESC
         """
-        results = await db.fetch_all(query, {"home_id": int(home_id)})
+        results = await self._fetch(query, int(home_id))
         
-        contributions = []
-        for result in results:
-            contributions.append({
-                "id": str(result["id"]),
-                "username": result["username"],
-                "home_id": str(result["home_id"]),
-                "product_name": result["product_name"],
-                "amount": float(result["amount"]),
-                "description": result["description"],
-                "date_created": result["date_created"],
-                "user_full_name": result["user_full_name"]
-            })
-        
-        return contributions
+        return [_row_to_contribution_dict(result) for result in results]
     
     async def delete_contribution(self, contribution_id: str, username: str) -> bool:
-        db = await self.get_database()
-        
-        query = "DELETE FROM contributions WHERE id = :id AND username = :username"
-        result = await db.execute(query, {"id": int(contribution_id), "username": username})
+        query = "DELETE FROM contributions WHERE id = $1 AND username = $2"
+        result = await self._execute(query, int(contribution_id), username)
         
         return result > 0
     
     async def get_analytics(self) -> dict:
-        db = await self.get_database()
-        
-        # Total contributions
-        total_contributions_query = "SELECT COUNT(*) as count FROM contributions"
-        total_contributions_result = await db.fetch_one(total_contributions_query)
-        total_contributions = total_contributions_result["count"]
-        
-        # Total amount
-        total_amount_query = "SELECT COALESCE(SUM(amount), 0) as total FROM contributions"
-        total_amount_result = await db.fetch_one(total_amount_query)
-        total_amount = float(total_amount_result["total"])
-        
-        # Contributions by user
-        contributions_by_user_query = """
-            SELECT 
-                c.username,
-                u.full_name,
-                COALESCE(SUM(c.amount), 0) as total_amount,
-                COUNT(c.id) as count
-            FROM contributions c
-            JOIN users u ON c.username = u.username
-            GROUP BY c.username, u.full_name
-            ORDER BY total_amount DESC
-        """
-        contributions_by_user_results = await db.fetch_all(contributions_by_user_query)
-        contributions_by_user = [
-            {
-                "username": result["username"],
-                "full_name": result["full_name"],
-                "total_amount": float(result["total_amount"]),
-                "count": result["count"]
-            }
-            for result in contributions_by_user_results
-        ]
-        
-        # Contributions by product (excluding fund transfers)
-        contributions_by_product_query = """
-            SELECT 
-                product_name,
-                COALESCE(SUM(amount), 0) as total_amount,
-                COUNT(id) as count
-            FROM contributions
-            WHERE product_name NOT LIKE 'Fund transfer%' AND product_name NOT LIKE 'Fund received%'
-            GROUP BY product_name
-            ORDER BY total_amount DESC
-        """
-        contributions_by_product_results = await db.fetch_all(contributions_by_product_query)
-        contributions_by_product = [
-            {
-                "product_name": result["product_name"],
-                "total_amount": float(result["total_amount"]),
-                "count": result["count"]
-            }
-            for result in contributions_by_product_results
-        ]
-        
-        # Monthly contributions
-        monthly_contributions_query = """
-            SELECT 
-                EXTRACT(YEAR FROM date_created) as year,
-                EXTRACT(MONTH FROM date_created) as month,
-                COALESCE(SUM(amount), 0) as total_amount,
-                COUNT(id) as count
-            FROM contributions
-            GROUP BY EXTRACT(YEAR FROM date_created), EXTRACT(MONTH FROM date_created)
-            ORDER BY year DESC, month DESC
-        """
-        monthly_contributions_results = await db.fetch_all(monthly_contributions_query)
-        monthly_contributions = [
-            {
-                "year": int(result["year"]),
-                "month": int(result["month"]),
-                "total_amount": float(result["total_amount"]),
-                "count": result["count"]
-            }
-            for result in monthly_contributions_results
-        ]
-        
-        return {
-            "total_contributions": total_contributions,
-            "total_amount": total_amount,
-            "contributions_by_user": contributions_by_user,
-            "contributions_by_product": contributions_by_product,
-            "monthly_contributions": monthly_contributions
-        }
+        return await self._fetch_analytics("")
 
     async def get_home_analytics(self, home_id: str) -> dict:
-        db = await self.get_database()
-        
-        # Total contributions for this home
-        total_contributions_query = "SELECT COUNT(*) as count FROM contributions WHERE home_id = :home_id"
-        total_contributions_result = await db.fetch_one(total_contributions_query, {"home_id": int(home_id)})
-        total_contributions = total_contributions_result["count"]
-        
-        # Total amount for this home
-        total_amount_query = "SELECT COALESCE(SUM(amount), 0) as total FROM contributions WHERE home_id = :home_id"
-        total_amount_result = await db.fetch_one(total_amount_query, {"home_id": int(home_id)})
-        total_amount = float(total_amount_result["total"])
-        
-        # Contributions by user in this home
-        contributions_by_user_query = """
-            SELECT 
-                c.username,
-                u.full_name,
-                COALESCE(SUM(c.amount), 0) as total_amount,
-                COUNT(c.id) as count
-            FROM contributions c
-            JOIN users u ON c.username = u.username
-            WHERE c.home_id = :home_id
-            GROUP BY c.username, u.full_name
-            ORDER BY total_amount DESC
-        """
-        contributions_by_user_results = await db.fetch_all(contributions_by_user_query, {"home_id": int(home_id)})
-        contributions_by_user = [
-            {
-                "username": result["username"],
-                "full_name": result["full_name"],
-                "total_amount": float(result["total_amount"]),
-                "count": result["count"]
-            }
-            for result in contributions_by_user_results
-        ]
-        
-        # Contributions by product in this home (excluding fund transfers)
-        contributions_by_product_query = """
-            SELECT 
-                product_name,
-                COALESCE(SUM(amount), 0) as total_amount,
-                COUNT(id) as count
-            FROM contributions
-            WHERE home_id = :home_id 
-                AND product_name NOT LIKE 'Fund transfer%' 
-                AND product_name NOT LIKE 'Fund received%'
-            GROUP BY product_name
-            ORDER BY total_amount DESC
-        """
-        contributions_by_product_results = await db.fetch_all(contributions_by_product_query, {"home_id": int(home_id)})
-        contributions_by_product = [
-            {
-                "product_name": result["product_name"],
-                "total_amount": float(result["total_amount"]),
-                "count": result["count"]
-            }
-            for result in contributions_by_product_results
-        ]
-        
-        # Monthly contributions for this home
-        monthly_contributions_query = """
-            SELECT 
-                EXTRACT(YEAR FROM date_created) as year,
-                EXTRACT(MONTH FROM date_created) as month,
-                COALESCE(SUM(amount), 0) as total_amount,
-                COUNT(id) as count
-            FROM contributions
-            WHERE home_id = :home_id
-            GROUP BY EXTRACT(YEAR FROM date_created), EXTRACT(MONTH FROM date_created)
-            ORDER BY year DESC, month DESC
-        """
-        monthly_contributions_results = await db.fetch_all(monthly_contributions_query, {"home_id": int(home_id)})
-        monthly_contributions = [
-            {
-                "year": int(result["year"]),
-                "month": int(result["month"]),
-                "total_amount": float(result["total_amount"]),
-                "count": result["count"]
-            }
-            for result in monthly_contributions_results
-        ]
+        return await self._fetch_analytics("WHERE c.home_id = $1", int(home_id))
+    
+    async def _fetch_analytics(self, where_clause: str, *args) -> dict:
+        """Compute totals, per-user, per-product and monthly aggregates from the rollup"""
+        # contribution_rollup holds one row per home/user/product/month, so this
+        # scans far fewer rows than contributions. Each grouping set yields its own
+        # rows; GROUPING() tells them apart. HAVING keeps the old inner-join and
+        # fund-transfer exclusions for their own sets only
+        query = _analytics_query(where_clause)
+        results = await self._fetch(query, *args)
+        
+        total_contributions = 0
+        total_amount = 0.0
+        contributions_by_user = []
+        contributions_by_product = []
+        monthly_contributions = []
+        for is_user, is_product, is_month, username, full_name, product_name, month_start, amount, count in results:
+            if is_user:
+                contributions_by_user.append({
+                    "username": username,
+                    "full_name": full_name,
+                    "total_amount": amount,
+                    "count": count
+                })
+            elif is_product:
+                contributions_by_product.append({
+                    "product_name": product_name,
+                    "total_amount": amount,
+                    "count": count
+                })
+            elif is_month:
+                monthly_contributions.append({
+                    "year": month_start.year,
+                    "month": month_start.month,
+                    "total_amount": amount,
+                    "count": count
+                })
+            else:
+                total_contributions = count
+                total_amount = amount
         
         return {
             "total_contributions": total_contributions,
@@ -554,88 +901,71 @@ class Database:
         }
     
     async def get_user_statistics(self, username: str) -> dict:
-        db = await self.get_database()
-        
-        # User's total contributions (including positive and negative amounts)
-        user_contributions_query = "SELECT COUNT(*) as count FROM contributions WHERE username = :username"
-        user_contributions_result = await db.fetch_one(user_contributions_query, {"username": username})
-        user_contributions = user_contributions_result["count"]
-        
-        # User's total contribution amount
-        user_total_amount = await self.get_user_balance(username)
-        
-        # User's transfer statistics
-        sent_transfers_query = "SELECT COUNT(*) as count FROM transfers WHERE sender_username = :username"
-        sent_transfers_result = await db.fetch_one(sent_transfers_query, {"username": username})
-        sent_transfers = sent_transfers_result["count"]
-        
-        received_transfers_query = "SELECT COUNT(*) as count FROM transfers WHERE recipient_username = :username"
-        received_transfers_result = await db.fetch_one(received_transfers_query, {"username": username})
-        received_transfers = received_transfers_result["count"]
-        
-        # User's recent contributions
-        recent_contributions_query = """
-            SELECT * FROM contributions 
-            WHERE username = :username 
-            ORDER BY date_created DESC 
-            LIMIT 5
+        # Counts, balance and the latest contributions come back in one row
+        statistics_query = """
+            SELECT
+                (SELECT COUNT(*) FROM contributions WHERE username = $1) as total_contributions,
+                (SELECT COALESCE(SUM(amount), 0) FROM contributions WHERE username = $1) as total_amount,
+                (SELECT COUNT(*) FROM transfers WHERE sender_username = $1) as sent_transfers,
+                (SELECT COUNT(*) FROM transfers WHERE recipient_username = $1) as received_transfers,
+                (
+                    SELECT json_agg(recent ORDER BY recent.date_created DESC)
+                    FROM (
+                        SELECT id, username, home_id, product_name, amount, description, date_created
+                        FROM contributions
+                        WHERE username = $1
+                        ORDER BY date_created DESC
+                        LIMIT 5
+                    ) recent
+                ) as recent_contributions
         """
-        recent_contributions_results = await db.fetch_all(recent_contributions_query, {"username": username})
+        result, contribution_stats = await asyncio.gather(
+            self._fetchrow(statistics_query, username),
+            self.get_contribution_to_average(username)
+        )
+        
         recent_contributions = [
             Contribution(
-                id=str(result["id"]),
-                username=result["username"],
-                home_id=str(result["home_id"]) if result["home_id"] else None,
-                product_name=result["product_name"],
-                amount=float(result["amount"]),
-                description=result["description"],
-                date_created=result["date_created"]
+                id=str(row["id"]),
+                username=row["username"],
+                home_id=str(row["home_id"]) if row["home_id"] else None,
+                product_name=row["product_name"],
+                amount=float(row["amount"]),
+                description=row["description"],
+                date_created=row["date_created"]
             )
-            for result in recent_contributions_results
+            for row in json.loads(result["recent_contributions"] or "[]")
         ]
-        
-        # Get contribution to average statistics
-        contribution_stats = await self.get_contribution_to_average(username)
+        user_total_amount = result["total_amount"]
         
         return {
-            "total_contributions": user_contributions,
+            "total_contributions": result["total_contributions"],
             "total_amount": user_total_amount,
             "current_balance": user_total_amount,  # Same as total amount now
-            "sent_transfers": sent_transfers,
-            "received_transfers": received_transfers,
+            "sent_transfers": result["sent_transfers"],
+            "received_transfers": result["received_transfers"],
             "recent_contributions": recent_contributions,
             "contribution_to_average": contribution_stats
         }
     
-    async def update_user_profile(self, username: str, full_name: str, email: str) -> bool:
-        db = await self.get_database()
-        
-        query = "UPDATE users SET full_name = :full_name, email = :email WHERE username = :username"
-        result = await db.execute(query, {
-            "full_name": full_name,
-            "email": email,
-            "username": username
-        })
+    async def update_user_profile(self, username: str, full_name: str, email: str) -> Optional[dict]:
+        """Update a profile and return the stored fields, or None if the user does not exist"""
+        query = "UPDATE users SET full_name = $1, email = $2 WHERE username = $3 RETURNING id, full_name, email"
+        result = await self._fetchrow(query, full_name, email, username)
+        self._forget_user(username)
         
-        return result > 0
+        return dict(result) if result else None
 
     async def get_monthly_contributions(self, year: int = None, month: int = None) -> List[dict]:
         """Get contributions filtered by month and year"""
-        db = await self.get_database()
-        
         # Build WHERE condition
         where_conditions = []
-        params = {}
-        
-        if year and month:
-            # Get contributions for specific month
-            where_conditions.append("EXTRACT(YEAR FROM date_created) = :year AND EXTRACT(MONTH FROM date_created) = :month")
-            params["year"] = year
-            params["month"] = month
-        elif year:
-            # Get contributions for entire year
-            where_conditions.append("EXTRACT(YEAR FROM date_created) = :year")
-            params["year"] = year
+        params = []
+        
+        if year:
+            # Get contributions for the month, or the entire year when no month is given
+            where_conditions.append("c.date_created >= $1 AND c.date_created < $2")
+            params = list(_period_bounds(year, month))
         
         where_clause = ""
         if where_conditions:
@@ -657,39 +987,31 @@ class Database:
             ORDER BY c.date_created DESC
         """
         
-        results = await db.fetch_all(query, params)
+        results = await self._fetch(query, *params)
         
-        contributions = []
-        for result in results:
-            contributions.append({
-                "id": str(result["id"]),
-                "username": result["username"],
-                "product_name": result["product_name"],
-                "amount": float(result["amount"]),
-                "description": result["description"],
-                "date_created": result["date_created"],
-                "user_full_name": result["user_full_name"]
-            })
-        
-        return contributions
+        return [
+            {
+                "id": str(contribution_id),
+                "username": username,
+                "product_name": product_name,
+                "amount": amount,
+                "description": description,
+                "date_created": date_created,
+                "user_full_name": user_full_name
+            }
+            for contribution_id, username, product_name, amount, description, date_created, user_full_name in results
+        ]
 
     async def get_home_monthly_contributions(self, home_id: str, year: int = None, month: int = None) -> List[dict]:
         """Get contributions filtered by home, month and year"""
-        db = await self.get_database()
-        
         # Build WHERE condition
-        where_conditions = ["c.home_id = :home_id"]
-        params = {"home_id": int(home_id)}
-        
-        if year and month:
-            # Get contributions for specific month
-            where_conditions.append("EXTRACT(YEAR FROM c.date_created) = :year AND EXTRACT(MONTH FROM c.date_created) = :month")
-            params["year"] = year
-            params["month"] = month
-        elif year:
-            # Get contributions for entire year
-            where_conditions.append("EXTRACT(YEAR FROM c.date_created) = :year")
-            params["year"] = year
+        where_conditions = ["c.home_id = $1"]
+        params = [int(home_id)]
+        
+        if year:
+            # Get contributions for the month, or the entire year when no month is given
+            where_conditions.append("c.date_created >= $2 AND c.date_created < $3")
+            params += _period_bounds(year, month)
         
         where_clause = "WHERE " + " AND ".join(where_conditions)
         
@@ -710,166 +1032,55 @@ class Database:
             ORDER BY c.date_created DESC
         """
         
-        results = await db.fetch_all(query, params)
+        results = await self._fetch(query, *params)
         
-        contributions = []
-        for result in results:
-            contributions.append({
-                "id": str(result["id"]),
-                "username": result["username"],
-                "home_id": str(result["home_id"]),
-                "product_name": result["product_name"],
-                "amount": float(result["amount"]),
-                "description": result["description"],
-                "date_created": result["date_created"],
-                "user_full_name": result["user_full_name"]
-            })
-        
-        return contributions
+        return [_row_to_contribution_dict(result) for result in results]
 
-    async def get_monthly_summary(self, year: int, month: int) -> dict:
-        """Get monthly summary statistics"""
-        db = await self.get_database()
-        
-        # Total contributions and amount for the month
-        total_query = """
-            SELECT 
-                COUNT(*) as total_count,
-                COALESCE(SUM(amount), 0) as total_amount
-            FROM contributions
-            WHERE EXTRACT(YEAR FROM date_created) = :year 
-                AND EXTRACT(MONTH FROM date_created) = :month
-        """
-        total_result = await db.fetch_one(total_query, {"year": year, "month": month})
-        total_amount = float(total_result["total_amount"])
-        total_count = total_result["total_count"]
-        
-        # Contributions by user for the month
-        user_query = """
-            SELECT 
-                c.username,
-                u.full_name,
-                COALESCE(SUM(c.amount), 0) as total_amount,
-                COUNT(c.id) as count
-            FROM contributions c
-            JOIN users u ON c.username = u.username
-            WHERE EXTRACT(YEAR FROM c.date_created) = :year 
-                AND EXTRACT(MONTH FROM c.date_created) = :month
-            GROUP BY c.username, u.full_name
-            ORDER BY total_amount DESC
-        """
-        user_results = await db.fetch_all(user_query, {"year": year, "month": month})
-        user_contributions = [
-            {
-                "username": result["username"],
-                "full_name": result["full_name"],
-                "total_amount": float(result["total_amount"]),
-                "count": result["count"]
-            }
-            for result in user_results
-        ]
-        
-        # Contributions by product for the month (excluding fund transfers)
-        product_query = """
-            SELECT 
-                product_name,
-                COALESCE(SUM(amount), 0) as total_amount,
-                COUNT(id) as count
-            FROM contributions
-            WHERE EXTRACT(YEAR FROM date_created) = :year 
-                AND EXTRACT(MONTH FROM date_created) = :month
-                AND product_name NOT LIKE 'Fund transfer%' 
-                AND product_name NOT LIKE 'Fund received%'
-            GROUP BY product_name
-            ORDER BY total_amount DESC
-        """
-        product_results = await db.fetch_all(product_query, {"year": year, "month": month})
-        product_contributions = [
-            {
-                "product_name": result["product_name"],
-                "total_amount": float(result["total_amount"]),
-                "count": result["count"]
-            }
-            for result in product_results
-        ]
-        
-        return {
-            "year": year,
-            "month": month,
-            "total_amount": total_amount,
-            "total_count": total_count,
-            "contributions_by_user": user_contributions,
-            "contributions_by_product": product_contributions
-        }
+    async def get_monthly_summary(self, year: int, month: int, top_n: Optional[int] = None) -> dict:
+        """Get monthly summary statistics; top_n caps the per-user and per-product lists"""
+        month_start, _ = _period_bounds(year, month)
+        return await self._fetch_monthly_summary(year, month, top_n, "c.month_start = $1", month_start)
 
-    async def get_home_monthly_summary(self, home_id: str, year: int, month: int) -> dict:
-        """Get monthly summary statistics for a specific home"""
-        db = await self.get_database()
-        
-        # Total contributions and amount for the month in this home
-        total_query = """
-            SELECT 
-                COUNT(*) as total_count,
-                COALESCE(SUM(amount), 0) as total_amount
-            FROM contributions
-            WHERE home_id = :home_id
-                AND EXTRACT(YEAR FROM date_created) = :year 
-                AND EXTRACT(MONTH FROM date_created) = :month
-        """
-        total_result = await db.fetch_one(total_query, {"home_id": int(home_id), "year": year, "month": month})
-        total_amount = float(total_result["total_amount"])
-        total_count = total_result["total_count"]
-        
-        # Contributions by user for the month in this home
-        user_query = """
-            SELECT 
-                c.username,
-                u.full_name,
-                COALESCE(SUM(c.amount), 0) as total_amount,
-                COUNT(c.id) as count
-            FROM contributions c
-            JOIN users u ON c.username = u.username
-            WHERE c.home_id = :home_id
-                AND EXTRACT(YEAR FROM c.date_created) = :year 
-                AND EXTRACT(MONTH FROM c.date_created) = :month
-            GROUP BY c.username, u.full_name
-            ORDER BY total_amount DESC
-        """
-        user_results = await db.fetch_all(user_query, {"home_id": int(home_id), "year": year, "month": month})
-        user_contributions = [
-            {
-                "username": result["username"],
-                "full_name": result["full_name"],
-                "total_amount": float(result["total_amount"]),
-                "count": result["count"]
-            }
-            for result in user_results
-        ]
-        
-        # Contributions by product for the month in this home (excluding fund transfers)
-        product_query = """
-            SELECT 
-                product_name,
-                COALESCE(SUM(amount), 0) as total_amount,
-                COUNT(id) as count
-            FROM contributions
-            WHERE home_id = :home_id
-                AND EXTRACT(YEAR FROM date_created) = :year 
-                AND EXTRACT(MONTH FROM date_created) = :month
-                AND product_name NOT LIKE 'Fund transfer%' 
-                AND product_name NOT LIKE 'Fund received%'
-            GROUP BY product_name
-            ORDER BY total_amount DESC
-        """
-        product_results = await db.fetch_all(product_query, {"home_id": int(home_id), "year": year, "month": month})
-        product_contributions = [
-            {
-                "product_name": result["product_name"],
-                "total_amount": float(result["total_amount"]),
-                "count": result["count"]
-            }
-            for result in product_results
-        ]
+    async def get_home_monthly_summary(self, home_id: str, year: int, month: int, top_n: Optional[int] = None) -> dict:
+        """Get monthly summary statistics for a specific home; top_n caps the per-user and per-product lists"""
+        month_start, _ = _period_bounds(year, month)
+        return await self._fetch_monthly_summary(
+            year, month, top_n,
+            "c.home_id = $1 AND c.month_start = $2",
+            int(home_id), month_start
+        )
+    
+    async def _fetch_monthly_summary(self, year: int, month: int, top_n: Optional[int], where_clause: str, *args) -> dict:
+        """Compute a month's totals, per-user and per-product sums from the rollup"""
+        # Same grouping-sets shape as _fetch_analytics, read from the trigger-kept
+        # contribution_rollup so a month costs one primary-key range. The empty set
+        # is the month total, the others carry the per-user (contributors with an
+        # account) and per-product (fund transfers excluded) breakdowns. Rows are
+        # ranked within their set so top_n trims the lists before they are sent
+        query = _monthly_summary_query(where_clause, len(args) + 1)
+        results = await self._fetch(query, *args, top_n)
+        
+        total_amount = 0.0
+        total_count = 0
+        user_contributions = []
+        product_contributions = []
+        for is_user, is_product, username, full_name, product_name, amount, count in results:
+            if is_user:
+                user_contributions.append({
+                    "username": username,
+                    "full_name": full_name,
+                    "total_amount": amount,
+                    "count": count
+                })
+            elif is_product:
+                product_contributions.append({
+                    "product_name": product_name,
+                    "total_amount": amount,
+                    "count": count
+                })
+            else:
+                total_amount = amount
+                total_count = count
         
         return {
             "year": year,
@@ -882,30 +1093,15 @@ class Database:
 
     async def get_user_balance(self, username: str) -> float:
         """Get user's total contribution amount (including negative transfers)"""
-        db = await self.get_database()
-        
         # Get total contributions (including negative amounts from transfers received)
-        query = "SELECT COALESCE(SUM(amount), 0) as total FROM contributions WHERE username = :username"
-        result = await db.fetch_one(query, {"username": username})
-        total_contributions = float(result["total"])
+        query = "SELECT COALESCE(SUM(amount), 0) as total FROM contributions WHERE username = $1"
+        result = await self._fetchrow(query, username)
+        total_contributions = result["total"]
         
         return total_contributions
 
     async def create_transfer(self, sender_username: str, transfer_data: TransferCreate) -> Transfer:
         """Create a new transfer between users - adjusts contribution amounts"""
-        db = await self.get_database()
-        
-        # Get sender and recipient users
-        sender = await self.get_user(sender_username)
-        recipient = await self.get_user(transfer_data.recipient_username)
-        
-        if not sender or not recipient:
-            raise ValueError("User not found")
-        
-        # Check if both users belong to the same home
-        if not sender.home_id or sender.home_id != recipient.home_id:
-            raise ValueError("Users must belong to the same home to transfer money")
-        
         # Check if sender is not transferring to themselves
         if sender_username == transfer_data.recipient_username:
             raise ValueError("Cannot transfer to yourself")
@@ -914,150 +1110,125 @@ class Database:
         if transfer_data.amount <= 0:
             raise ValueError("Transfer amount must be positive")
         
-        # Create the transfer record
-        transfer_query = """
-            INSERT INTO transfers (sender_username, recipient_username, home_id, amount, description, date_created)
-            VALUES (:sender_username, :recipient_username, :home_id, :amount, :description, :date_created)
-            RETURNING id, sender_username, recipient_username, home_id, amount, description, date_created
-        """
-        transfer_values = {
-            "sender_username": sender_username,
-            "recipient_username": transfer_data.recipient_username,
-            "home_id": int(sender.home_id),
-            "amount": transfer_data.amount,
-            "description": transfer_data.description or "Fund transfer to balance contributions",
-            "date_created": datetime.utcnow()
-        }
-        
-        result = await db.fetch_one(transfer_query, transfer_values)
-        
-        # Create contribution adjustments
-        # Add contribution for sender (giver)
-        await self.create_contribution(sender_username, {
-            "product_name": f"Fund transfer to {recipient.full_name}",
-            "amount": transfer_data.amount,
-            "description": f"Transfer to {recipient.full_name}: {transfer_data.description or 'Balancing household contributions'}"
-        })
+        # The cached users only supply names for the descriptions; membership is
+        # checked against home_members inside the insert below
+        sender, recipient = await asyncio.gather(
+            self.get_user(sender_username),
+            self.get_user(transfer_data.recipient_username)
+        )
         
-        # Subtract contribution for recipient (receiver) by creating a negative contribution
-        await self.create_contribution(transfer_data.recipient_username, {
-            "product_name": f"Fund received from {sender.full_name}",
-            "amount": -transfer_data.amount,
-            "description": f"Received from {sender.full_name}: {transfer_data.description or 'Balancing household contributions'}"
-        })
+        if not sender or not recipient:
+            raise ValueError("User not found")
         
-        return Transfer(
-            id=str(result["id"]),
-            sender_username=result["sender_username"],
-            recipient_username=result["recipient_username"],
-            home_id=str(result["home_id"]),
-            amount=float(result["amount"]),
-            description=result["description"],
-            date_created=result["date_created"]
+        # The transfer and both contribution adjustments go in as one statement, so
+        # they commit or fail together: the sender is credited the amount and the
+        # recipient gets the matching negative contribution. The transfer row only
+        # exists if both users are members of the same home right now
+        note = transfer_data.description or 'Balancing household contributions'
+        transfer_query = """
+            WITH t AS (
+                INSERT INTO transfers (sender_username, recipient_username, home_id, amount, description, date_created)
+                SELECT s.username, r.username, s.home_id, $3, $4, $5
+                FROM home_members s
+                JOIN home_members r ON r.home_id = s.home_id AND r.username = $2
+                WHERE s.username = $1
+                RETURNING id, sender_username, recipient_username, home_id, amount, description, date_created
+            ), adjustments AS (
+                INSERT INTO contributions (username, home_id, product_name, amount, description, date_created)
+                SELECT sender_username, home_id, $6, amount, $7, date_created FROM t
+                UNION ALL
+                SELECT recipient_username, home_id, $8, -amount, $9, date_created FROM t
+            )
+            SELECT id, sender_username, recipient_username, home_id, amount, description, date_created FROM t
+        """
+        result = await self._fetchrow(
+            transfer_query,
+            sender_username,
+            transfer_data.recipient_username,
+            transfer_data.amount,
+            transfer_data.description or "Fund transfer to balance contributions",
+            datetime.utcnow(),
+            f"Fund transfer to {recipient.full_name}",
+            f"Transfer to {recipient.full_name}: {note}",
+            f"Fund received from {sender.full_name}",
+            f"Received from {sender.full_name}: {note}"
         )
+        if not result:
+            raise ValueError("Users must belong to the same home to transfer money")
+        
+        return _row_to_transfer(result)
 
     async def get_user_transfers(self, username: str) -> dict:
         """Get all transfers for a user (sent and received)"""
-        db = await self.get_database()
-        
-        # Get sent transfers
-        sent_query = "SELECT * FROM transfers WHERE sender_username = :username ORDER BY date_created DESC"
-        sent_results = await db.fetch_all(sent_query, {"username": username})
-        
-        sent_transfers = []
-        for result in sent_results:
-            # Get recipient full name
-            recipient = await self.get_user(result["recipient_username"])
-            transfer = Transfer(
-                id=str(result["id"]),
-                sender_username=result["sender_username"],
-                recipient_username=result["recipient_username"],
-                home_id=str(result["home_id"]),
-                amount=float(result["amount"]),
-                description=result["description"],
-                date_created=result["date_created"]
-            )
-            # Add recipient full name as an attribute
-            transfer.recipient_full_name = recipient.full_name if recipient else "Unknown"
-            sent_transfers.append(transfer)
-        
-        # Get received transfers
-        received_query = "SELECT * FROM transfers WHERE recipient_username = :username ORDER BY date_created DESC"
-        received_results = await db.fetch_all(received_query, {"username": username})
-        
-        received_transfers = []
-        for result in received_results:
-            # Get sender full name
-            sender = await self.get_user(result["sender_username"])
-            transfer = Transfer(
-                id=str(result["id"]),
-                sender_username=result["sender_username"],
-                recipient_username=result["recipient_username"],
-                home_id=str(result["home_id"]),
-                amount=float(result["amount"]),
-                description=result["description"],
-                date_created=result["date_created"]
-            )
-            # Add sender full name as an attribute
-            transfer.sender_full_name = sender.full_name if sender else "Unknown"
-            received_transfers.append(transfer)
+        # Each side joins the counterparty's full name in, so no per-row user lookups
+        sent_query = """
+            SELECT t.id, t.sender_username, t.recipient_username, t.home_id, t.amount, t.description, t.date_created,
+                COALESCE(u.full_name, 'Unknown') as recipient_full_name
+            FROM transfers t
+            LEFT JOIN users u ON u.username = t.recipient_username
+            WHERE t.sender_username = $1
+            ORDER BY t.date_created DESC
+        """
+        received_query = """
+            SELECT t.id, t.sender_username, t.recipient_username, t.home_id, t.amount, t.description, t.date_created,
+                COALESCE(u.full_name, 'Unknown') as sender_full_name
+            FROM transfers t
+            LEFT JOIN users u ON u.username = t.sender_username
+            WHERE t.recipient_username = $1
+            ORDER BY t.date_created DESC
+        """
+        sent_results, received_results = await asyncio.gather(
+            self._fetch(sent_query, username),
+            self._fetch(received_query, username)
+        )
         
         return {
-            "sent": sent_transfers,
-            "received": received_transfers
+            "sent": [
+                _row_to_transfer(result, recipient_full_name=result["recipient_full_name"])
+                for result in sent_results
+            ],
+            "received": [
+                _row_to_transfer(result, sender_full_name=result["sender_full_name"])
+                for result in received_results
+            ]
         }
 
     async def get_all_users(self) -> List[UserInDB]:
         """Get all users for transfer recipient selection"""
-        db = await self.get_database()
-        query = "SELECT id, username, email, full_name, is_active, home_id, date_created FROM users ORDER BY full_name"
-        results = await db.fetch_all(query)
-        
-        users = []
-        for result in results:
-            users.append(UserInDB(
-                id=str(result["id"]),
-                username=result["username"],
-                email=result["email"],
-                full_name=result["full_name"],
-                hashed_password="",  # Don't return password hash
-                is_active=result["is_active"],
-                home_id=str(result["home_id"]) if result["home_id"] else None,
-                date_created=result["date_created"]
-            ))
+        # Don't return password hash
+        query = """
+            SELECT id, username, email, full_name, '' as hashed_password, is_active, home_id, date_created
+            FROM users_with_home
+            ORDER BY full_name
+        """
+        results = await self._fetch(query)
         
-        return users
+        return [_row_to_user(result) for result in results]
 
     # Home management methods
     async def create_home(self, home_data: HomeCreate, leader_username: str) -> Home:
-        db = await self.get_database()
-        
+        # The home and the leader's membership are one statement, so a leader who
+        # already belongs to a home can never leave an orphaned home holding the name
         home_query = """
-            INSERT INTO homes (name, description, leader_username, date_created)
-            VALUES (:name, :description, :leader_username, :date_created)
-            RETURNING id, name, description, leader_username, date_created
+            WITH h AS (
+                INSERT INTO homes (name, description, leader_username, date_created)
+                VALUES ($1, $2, $3, $4)
+                RETURNING id, name, description, leader_username, date_created
+            ), m AS (
+                INSERT INTO home_members (home_id, username)
+                SELECT id, leader_username FROM h
+            )
+            SELECT id, name, description, leader_username, date_created FROM h
         """
-        home_values = {
-            "name": home_data.name,
-            "description": home_data.description,
-            "leader_username": leader_username,
-            "date_created": datetime.utcnow()
-        }
-        
-        result = await db.fetch_one(home_query, home_values)
-        home_id = result["id"]
-        
-        # Update the user's home_id
-        await db.execute(
-            "UPDATE users SET home_id = :home_id WHERE username = :username",
-            {"home_id": home_id, "username": leader_username}
-        )
-        
-        # Add to home_members table
-        await db.execute(
-            "INSERT INTO home_members (home_id, username) VALUES (:home_id, :username)",
-            {"home_id": home_id, "username": leader_username}
-        )
+        try:
+            result = await self._fetchrow(
+                home_query, home_data.name, home_data.description, leader_username, datetime.utcnow()
+            )
+        except asyncpg.UniqueViolationError as e:
+            if e.constraint_name == "homes_name_key":
+                raise ValueError("A home with that name already exists")
+            raise ValueError("You are already in a home")
+        self._forget_user(leader_username)
         
         # Get members list (just the leader for now)
         members = [leader_username]
@@ -1072,71 +1243,106 @@ class Database:
         )
 
     async def get_home(self, home_id: str) -> Optional[Home]:
-        db = await self.get_database()
-        
         try:
-            # Get home info
-            home_query = "SELECT * FROM homes WHERE id = :home_id"
-            home_result = await db.fetch_one(home_query, {"home_id": int(home_id)})
-            
-            if home_result:
-                # Get members
-                members_query = "SELECT username FROM home_members WHERE home_id = :home_id"
-                members_results = await db.fetch_all(members_query, {"home_id": int(home_id)})
-                members = [row["username"] for row in members_results]
-                
-                return Home(
-                    id=str(home_result["id"]),
-                    name=home_result["name"],
-                    description=home_result["description"],
-                    leader_username=home_result["leader_username"],
-                    members=members,
-                    date_created=home_result["date_created"]
-                )
-        except:
-            pass
+            home_key = int(home_id)
+        except (TypeError, ValueError):
+            return None
+        home = self._home_cache.get(home_key)
+        if home is None:
+            home = await self._load_home(home_key)
+            if home:
+                self._home_cache.set(home_key, home)
+        return home
+    
+    async def _load_home(self, home_id: int) -> Optional[Home]:
+        # Home row and its member usernames in one round trip
+        home_query = """
+            SELECT h.id, h.name, h.description, h.leader_username, h.date_created,
+                ARRAY(SELECT hm.username FROM home_members hm WHERE hm.home_id = h.id ORDER BY hm.id) as members
+            FROM homes h
+            WHERE h.id = $1
+        """
+        home_result = await self._fetchrow(home_query, home_id)
+        
+        if home_result:
+            return Home(
+                id=str(home_result["id"]),
+                name=home_result["name"],
+                description=home_result["description"],
+                leader_username=home_result["leader_username"],
+                members=home_result["members"],
+                date_created=home_result["date_created"]
+            )
         return None
 
     async def get_user_home(self, username: str) -> Optional[Home]:
-        db = await self.get_database()
         user = await self.get_user(username)
         if user and user.home_id:
             return await self.get_home(user.home_id)
         return None
 
+    async def get_user_with_home(self, username: str) -> Tuple[Optional[UserInDB], Optional[Home]]:
+        """User and their home; a cold cache loads both in one round trip"""
+        user = self._user_cache.get(username)
+        if user is not None:
+            return user, await self.get_home(user.home_id) if user.home_id else None
+        
+        query = """
+            SELECT u.id, u.username, u.email, u.full_name, u.hashed_password, u.is_active, u.home_id, u.date_created,
+                h.name, h.description, h.leader_username, h.date_created as home_date_created,
+                ARRAY(SELECT hm.username FROM home_members hm WHERE hm.home_id = h.id ORDER BY hm.id) as members
+            FROM users_with_home u
+            LEFT JOIN homes h ON h.id = u.home_id
+            WHERE u.username = $1
+        """
+        generation = self._user_generation
+        result = await self._fetchrow(query, username)
+        if not result:
+            return None, None
+        
+        user = _row_to_user(result)
+        if generation == self._user_generation:
+            self._user_cache.set(username, user)
+        if result["leader_username"] is None:
+            return user, None
+        
+        home = Home(
+            id=user.home_id,
+            name=result["name"],
+            description=result["description"],
+            leader_username=result["leader_username"],
+            members=result["members"],
+            date_created=result["home_date_created"]
+        )
+        self._home_cache.set(result["home_id"], home)
+        return user, home
+
     async def add_member_to_home(self, home_id: str, username: str, leader_username: str) -> bool:
-        db = await self.get_database()
+        # The home and the user are independent lookups, so fetch them together
+        home, user = await asyncio.gather(self.get_home(home_id), self.get_user(username))
         
         # Check if the requester is the home leader
-        home = await self.get_home(home_id)
         if not home or home.leader_username != leader_username:
             return False
         
         # Check if user exists and is not already in a home
-        user = await self.get_user(username)
         if not user or user.home_id:
             return False
         
         try:
             # Add user to home members
-            await db.execute(
-                "INSERT INTO home_members (home_id, username) VALUES (:home_id, :username)",
-                {"home_id": int(home_id), "username": username}
-            )
-            
-            # Update user's home_id
-            await db.execute(
-                "UPDATE users SET home_id = :home_id WHERE username = :username",
-                {"home_id": int(home_id), "username": username}
+            await self._execute(
+                "INSERT INTO home_members (home_id, username) VALUES ($1, $2)",
+                int(home_id), username
             )
+            self._forget_user(username)
+            self._home_cache.pop(int(home_id))
             
             return True
-        except:
+        except asyncpg.UniqueViolationError:
             return False
 
     async def remove_member_from_home(self, home_id: str, username: str, leader_username: str) -> bool:
-        db = await self.get_database()
-        
         # Check if the requester is the home leader
         home = await self.get_home(home_id)
         if not home or home.leader_username != leader_username:
@@ -1146,242 +1352,193 @@ class Database:
         if username == leader_username:
             return False
         
-        try:
-            # Remove user from home members
-            await db.execute(
-                "DELETE FROM home_members WHERE home_id = :home_id AND username = :username",
-                {"home_id": int(home_id), "username": username}
-            )
-            
-            # Remove user's home_id
-            await db.execute(
-                "UPDATE users SET home_id = NULL WHERE username = :username",
-                {"username": username}
-            )
-            
-            return True
-        except:
-            return False
+        # Remove user from home members
+        await self._execute(
+            "DELETE FROM home_members WHERE home_id = $1 AND username = $2",
+            int(home_id), username
+        )
+        self._forget_user(username)
+        self._home_cache.pop(int(home_id))
+        
+        return True
 
     async def get_home_members(self, home_id: str) -> List[User]:
-        db = await self.get_database()
-        home = await self.get_home(home_id)
-        if not home:
-            return []
-        
-        members = []
-        for username in home.members:
-            user = await self.get_user(username)
-            if user:
-                members.append(User(
-                    id=user.id,
-                    username=user.username,
-                    email=user.email,
-                    full_name=user.full_name,
-                    is_active=user.is_active,
-                    home_id=user.home_id
-                ))
+        query = """
+            SELECT u.id, u.username, u.email, u.full_name, u.is_active, hm.home_id
+            FROM home_members hm
+            JOIN users u ON u.username = hm.username
+            WHERE hm.home_id = $1
+            ORDER BY hm.id
+        """
+        results = await self._fetch(query, int(home_id))
         
-        return members
+        return [
+            User.model_construct(
+                id=str(result["id"]),
+                username=result["username"],
+                email=result["email"],
+                full_name=result["full_name"],
+                is_active=result["is_active"],
+                home_id=str(result["home_id"])
+            )
+            for result in results
+        ]
 
     async def leave_home(self, username: str) -> bool:
-        db = await self.get_database()
         user = await self.get_user(username)
         
         if not user or not user.home_id:
             return False
         
-        home = await self.get_home(user.home_id)
+        # Only the leader and the head count matter here; the count is the
+        # trigger-kept members_count, so no member rows are read at all
+        home = await self._fetchrow(
+            """
+            SELECT h.leader_username, COALESCE(ag.members_count, 0) as member_count
+            FROM homes h
+            LEFT JOIN home_aggregates ag ON ag.home_id = h.id
+            WHERE h.id = $1
+            """,
+            int(user.home_id)
+        )
         if not home:
             return False
+        is_leader = home["leader_username"] == username
         
         # If user is the leader, they cannot leave unless they're the only member
-        if home.leader_username == username and len(home.members) > 1:
+        if is_leader and home["member_count"] > 1:
             return False
         
-        try:
-            # Remove user from home members
-            await db.execute(
-                "DELETE FROM home_members WHERE home_id = :home_id AND username = :username",
-                {"home_id": int(user.home_id), "username": username}
-            )
-            
-            # Remove user's home_id
-            await db.execute(
-                "UPDATE users SET home_id = NULL WHERE username = :username",
-                {"username": username}
+        # Remove user from home members
+        await self._execute(
+            "DELETE FROM home_members WHERE home_id = $1 AND username = $2",
+            int(user.home_id), username
+        )
+        self._forget_user(username)
+        self._home_cache.pop(int(user.home_id))
+        
+        # If user was the leader and the only member, delete the home
+        if is_leader and home["member_count"] == 1:
+            await self._execute(
+                "DELETE FROM homes WHERE id = $1",
+                int(user.home_id)
             )
-            
-            # If user was the leader and the only member, delete the home
-            if home.leader_username == username and len(home.members) == 1:
-                await db.execute(
-                    "DELETE FROM homes WHERE id = :home_id",
-                    {"home_id": int(user.home_id)}
-                )
-            
-            return True
-        except:
-            return False
+        
+        return True
 
     async def create_join_request(self, username: str, home_name: str) -> bool:
         """Create a join request for a user to join a home"""
-        db = await self.get_database()
+        # Resolve the home and skip duplicates of a pending request in the same
+        # statement as the insert; nothing is inserted if either check fails
+        request_query = """
+            WITH h AS (SELECT id FROM homes WHERE name = $2::varchar LIMIT 1)
+            INSERT INTO join_requests (username, home_id, home_name, status, date_created)
+            SELECT $1::varchar, h.id, $2::varchar, 'pending', $3
+            FROM h
+            WHERE NOT EXISTS (
+                SELECT 1 FROM join_requests
+                WHERE username = $1 AND home_id = h.id AND status = 'pending'
+            )
+        """
+        created = await self._execute(request_query, username, home_name, datetime.utcnow())
         
-        try:
-            # Check if home exists
-            home_query = "SELECT * FROM homes WHERE name = :home_name"
-            home_result = await db.fetch_one(home_query, {"home_name": home_name})
-            if not home_result:
-                return False
-            
-            # Check if user already has a pending request for this home
-            existing_query = """
-                SELECT * FROM join_requests 
-                WHERE username = :username AND home_id = :home_id AND status = 'pending'
-            """
-            existing_result = await db.fetch_one(existing_query, {
-                "username": username,
-                "home_id": home_result["id"]
-            })
-            if existing_result:
-                return False
-            
-            # Create join request
-            request_query = """
-                INSERT INTO join_requests (username, home_id, home_name, status, date_created)
-                VALUES (:username, :home_id, :home_name, :status, :date_created)
-            """
-            await db.execute(request_query, {
-                "username": username,
-                "home_id": home_result["id"],
-                "home_name": home_name,
-                "status": "pending",
-                "date_created": datetime.utcnow()
-            })
-            
-            return True
-        except:
-            return False
+        return created > 0
     
     async def get_pending_join_requests(self, home_id: str) -> List[dict]:
         """Get all pending join requests for a home"""
-        db = await self.get_database()
+        query = """
+            SELECT jr.id, jr.username, jr.date_created, u.full_name, u.email
+            FROM join_requests jr
+            JOIN users u ON jr.username = u.username
+            WHERE jr.home_id = $1 AND jr.status = 'pending'
+            ORDER BY jr.date_created DESC
+        """
+        results = await self._fetch(query, int(home_id))
         
-        try:
-            query = """
-                SELECT jr.*, u.full_name, u.email
-                FROM join_requests jr
-                JOIN users u ON jr.username = u.username
-                WHERE jr.home_id = :home_id AND jr.status = 'pending'
-                ORDER BY jr.date_created DESC
-            """
-            results = await db.fetch_all(query, {"home_id": int(home_id)})
-            
-            requests = []
-            for result in results:
-                requests.append({
-                    "id": str(result["id"]),
-                    "username": result["username"],
-                    "full_name": result["full_name"],
-                    "email": result["email"],
-                    "date_created": result["date_created"]
-                })
-            
-            return requests
-        except:
-            return []
+        return [
+            {
+                "id": str(request_id),
+                "username": username,
+                "full_name": full_name,
+                "email": email,
+                "date_created": date_created
+            }
+            for request_id, username, date_created, full_name, email in results
+        ]
     
     async def get_user_pending_request(self, username: str) -> Optional[dict]:
         """Get user's pending join request if any"""
-        db = await self.get_database()
+        query = """
+            SELECT id, home_name, date_created FROM join_requests 
+            WHERE username = $1 AND status = 'pending'
+        """
+        result = await self._fetchrow(query, username)
         
-        try:
-            query = """
-                SELECT * FROM join_requests 
-                WHERE username = :username AND status = 'pending'
-            """
-            result = await db.fetch_one(query, {"username": username})
-            
-            if result:
-                return {
-                    "id": str(result["id"]),
-                    "home_name": result["home_name"],
-                    "date_created": result["date_created"]
-                }
-            return None
-        except:
-            return None
+        if result:
+            return {
+                "id": str(result["id"]),
+                "home_name": result["home_name"],
+                "date_created": result["date_created"]
+            }
+        return None
     
     async def approve_join_request(self, request_id: str, leader_username: str) -> bool:
         """Approve a join request"""
-        db = await self.get_database()
-        
+        return await self.approve_join_requests([request_id], leader_username) > 0
+    
+    async def approve_join_requests(self, request_ids: List[str], leader_username: str) -> int:
+        """Approve several join requests in one statement and return how many were approved"""
         try:
-            # Get the join request
-            request_query = "SELECT * FROM join_requests WHERE id = :request_id"
-            request_result = await db.fetch_one(request_query, {"request_id": int(request_id)})
-            if not request_result or request_result["status"] != "pending":
-                return False
-            
-            # Verify that the current user is the leader of the home
-            home_query = "SELECT * FROM homes WHERE id = :home_id"
-            home_result = await db.fetch_one(home_query, {"home_id": request_result["home_id"]})
-            if not home_result or home_result["leader_username"] != leader_username:
-                return False
-            
-            # Add user to home
-            await db.execute(
-                "UPDATE users SET home_id = :home_id WHERE username = :username",
-                {"home_id": request_result["home_id"], "username": request_result["username"]}
-            )
-            
-            # Add user to home members
-            await db.execute(
-                "INSERT INTO home_members (home_id, username) VALUES (:home_id, :username)",
-                {"home_id": request_result["home_id"], "username": request_result["username"]}
-            )
-            
-            # Update request status
-            await db.execute(
-                "UPDATE join_requests SET status = 'approved', date_processed = :date_processed WHERE id = :request_id",
-                {"request_id": int(request_id), "date_processed": datetime.utcnow()}
-            )
-            
-            return True
-        except:
-            return False
+            # The leader check, status flip and membership insert are one statement:
+            # a request that is not pending, not for the caller's home, or from a user
+            # who already has a home updates nothing, and a failed insert rolls every
+            # status change in the batch back with it
+            query = """
+                WITH req AS (
+                    UPDATE join_requests jr
+                    SET status = 'approved', date_processed = $3
+                    WHERE jr.id = ANY($1::int[])
+                        AND jr.status = 'pending'
+                        AND EXISTS (SELECT 1 FROM homes h WHERE h.id = jr.home_id AND h.leader_username = $2)
+                        AND NOT EXISTS (SELECT 1 FROM home_members hm WHERE hm.username = jr.username)
+                    RETURNING jr.home_id, jr.username
+                )
+                INSERT INTO home_members (home_id, username)
+                SELECT home_id, username FROM req
+                RETURNING home_id, username
+            """
+            results = await self._fetch(query, [int(request_id) for request_id in request_ids], leader_username, datetime.utcnow())
+        except (asyncpg.UniqueViolationError, ValueError):
+            return 0
+        
+        for home_id, username in results:
+            self._forget_user(username)
+            self._home_cache.pop(home_id)
+        
+        return len(results)
     
     async def reject_join_request(self, request_id: str, leader_username: str) -> bool:
         """Reject a join request"""
-        db = await self.get_database()
-        
+        return await self.reject_join_requests([request_id], leader_username) > 0
+    
+    async def reject_join_requests(self, request_ids: List[str], leader_username: str) -> int:
+        """Reject several join requests in one statement and return how many were rejected"""
         try:
-            # Get the join request
-            request_query = "SELECT * FROM join_requests WHERE id = :request_id"
-            request_result = await db.fetch_one(request_query, {"request_id": int(request_id)})
-            if not request_result or request_result["status"] != "pending":
-                return False
-            
-            # Verify that the current user is the leader of the home
-            home_query = "SELECT * FROM homes WHERE id = :home_id"
-            home_result = await db.fetch_one(home_query, {"home_id": request_result["home_id"]})
-            if not home_result or home_result["leader_username"] != leader_username:
-                return False
-            
-            # Update request status
-            await db.execute(
-                "UPDATE join_requests SET status = 'rejected', date_processed = :date_processed WHERE id = :request_id",
-                {"request_id": int(request_id), "date_processed": datetime.utcnow()}
-            )
-            
-            return True
-        except:
-            return False
+            ids = [int(request_id) for request_id in request_ids]
+        except ValueError:
+            return 0
+        
+        query = """
+            UPDATE join_requests jr
+            SET status = 'rejected', date_processed = $3
+            WHERE jr.id = ANY($1::int[])
+                AND jr.status = 'pending'
+                AND EXISTS (SELECT 1 FROM homes h WHERE h.id = jr.home_id AND h.leader_username = $2)
+        """
+        return await self._execute(query, ids, leader_username, datetime.utcnow())
 
     async def get_eligible_transfer_recipients(self, sender_username: str) -> List[dict]:
         """Get users in the same home who are eligible to receive fund transfers (all home members except sender)"""
-        db = await self.get_database()
-        
         try:
             # Get sender's home
             sender = await self.get_user(sender_username)
@@ -1398,91 +1555,84 @@ class Database:
                     u.username,
                     u.full_name,
                     COALESCE(SUM(c.amount), 0) as total_contribution
-                FROM users u
-                LEFT JOIN contributions c ON u.username = c.username AND c.home_id = :home_id
-                WHERE u.home_id = :home_id AND u.username != :sender_username
+                FROM home_members hm
+                JOIN users u ON u.username = hm.username
+                LEFT JOIN contributions c ON u.username = c.username AND c.home_id = $1
+                WHERE hm.home_id = $1 AND u.username != $2
                 GROUP BY u.username, u.full_name
                 ORDER BY u.full_name
             """
             
-            results = await db.fetch_all(query, {
-                "home_id": int(sender.home_id),
-                "sender_username": sender_username
-            })
+            results = await self._fetch(query, int(sender.home_id), sender_username)
             
-            eligible_recipients = []
-            for result in results:
-                eligible_recipients.append({
-                    "username": result["username"],
-                    "full_name": result["full_name"],
-                    "total_contribution": float(result["total_contribution"])
-                })
-            
-            return eligible_recipients
+            # Column names already match the template's keys
+            return [dict(result) for result in results]
             
-        except Exception as e:
-            print(f"Error getting eligible transfer recipients: {str(e)}")
+        except asyncpg.PostgresError as e:
+            logger.error("Error getting eligible transfer recipients: %s", e)
             return []
 
     async def get_contribution_to_average(self, username: str) -> dict:
         """Calculate how much user needs to contribute to reach the average contribution of their home"""
-        db = await self.get_database()
-        
         try:
-            # Get user's home
+            # A version probe is one primary-key read; while it is unchanged the
+            # cached result still describes this home
             user = await self.get_user(username)
-            if not user or not user.home_id:
-                return {
-                    "user_total": 0,
-                    "average_contribution": 0,
-                    "amount_to_reach_average": 0,
-                    "is_above_average": False,
-                    "home_members_count": 0
-                }
-            
-            # Get home members count
-            home = await self.get_home(user.home_id)
-            if not home:
-                return {
-                    "user_total": 0,
-                    "average_contribution": 0,
-                    "amount_to_reach_average": 0,
-                    "is_above_average": False,
-                    "home_members_count": 0
-                }
-            
-            # Get total contributions by all home members
-            home_total_query = "SELECT COALESCE(SUM(amount), 0) as total FROM contributions WHERE home_id = :home_id"
-            home_total_result = await db.fetch_one(home_total_query, {"home_id": int(user.home_id)})
-            home_total = float(home_total_result["total"])
+            if user and user.home_id:
+                home_id = int(user.home_id)
+                version = await self._fetchval("SELECT version FROM home_aggregates WHERE home_id = $1", home_id)
+                cached = self._average_cache.get((home_id, username, version))
+                if cached is not None:
+                    return dict(cached)
             
-            # Get user's total contributions
-            user_total_query = "SELECT COALESCE(SUM(amount), 0) as total FROM contributions WHERE username = :username AND home_id = :home_id"
-            user_total_result = await db.fetch_one(user_total_query, {"username": username, "home_id": int(user.home_id)})
-            user_total = float(user_total_result["total"])
-            
-            # Calculate average contribution per member
-            home_members_count = len(home.members)
-            average_contribution = home_total / home_members_count if home_members_count > 0 else 0
-            
-            # Calculate amount needed to reach average
-            amount_to_reach_average = max(0, average_contribution - user_total)
-            is_above_average = user_total >= average_contribution
+            # The home total and member count are point lookups in the trigger-kept
+            # home_aggregates row; only the user's own total still sums rollup rows,
+            # along the (home_id, username) prefix of its primary key
+            query = """
+                SELECT 
+                    ag.home_id,
+                    ag.version,
+                    ag.members_count as member_count,
+                    t.user_total,
+                    ag.total_amount as home_total,
+                    a.average_contribution,
+                    GREATEST(0, d.shortfall) as amount_to_reach_average,
+                    d.shortfall <= 0 as is_above_average
+                FROM home_members hm
+                JOIN home_aggregates ag ON ag.home_id = hm.home_id
+                CROSS JOIN LATERAL (
+                    SELECT COALESCE(SUM(total_amount), 0) as user_total
+                    FROM contribution_rollup
+                    WHERE home_id = hm.home_id AND username = $1
+                ) t
+                CROSS JOIN LATERAL (
+                    SELECT COALESCE(ag.total_amount / NULLIF(ag.members_count, 0), 0) as average_contribution
+                ) a
+                -- Both outputs derive from one difference against the average
+                CROSS JOIN LATERAL (
+                    SELECT a.average_contribution - t.user_total as shortfall
+                ) d
+                WHERE hm.username = $1
+            """
+            result = await self._fetchrow(query, username)
+            if not result:
+                return dict(EMPTY_CONTRIBUTION_STATS)
             
-            return {
-                "user_total": user_total,
-                "average_contribution": average_contribution,
-                "amount_to_reach_average": amount_to_reach_average,
-                "is_above_average": is_above_average,
-                "home_members_count": home_members_count,
-                "home_total": home_total
-            }
-        except Exception as e:
-            print(f"Error calculating contribution to average: {str(e)}")
-            return {
-                "user_total": 0,
-                "average_contribution": 0,
-                "amount_to_reach_average": 0,
-                "is_above_average": False,
-                "home_members_count": 0
+            stats = {
+                "user_total": result["user_total"],
+                "average_contribution": result["average_contribution"],
+                "amount_to_reach_average": result["amount_to_reach_average"],
+                "is_above_average": result["is_above_average"],
+                "home_members_count": result["member_count"],
+                "home_total": result["home_total"]
             }
+            self._average_cache.set((result["home_id"], username, result["version"]), stats)
+            return dict(stats)
+        except asyncpg.PostgresError as e:
+            logger.error("Error calculating contribution to average: %s", e)
+            return dict(EMPTY_CONTRIBUTION_STATS)
+
+@lru_cache(maxsize=1)
+def get_db() -> Database:
+    """Process-wide Database, so every caller shares one connection pool"""
+    return Database()
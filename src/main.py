@@ -1,18 +1,31 @@
 from fastapi import FastAPI, Request, Depends, HTTPException, status, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime, timedelta
-from typing import Optional, AsyncGenerator
+from datetime import datetime, MINYEAR, MAXYEAR
+from typing import Optional, AsyncGenerator, List, Tuple
 from contextlib import asynccontextmanager
+from functools import lru_cache
+from urllib.parse import quote
+import calendar
+import re
+import secrets
 import os
+import asyncio
+import time
 import logging
+import orjson
+import asyncpg
+import jinja2
 from dotenv import load_dotenv
-from database import Database
+from database import get_db
 from models import User, UserCreate, UserInDB, Token, Contribution, Transfer, TransferCreate, Home, HomeCreate
-from auth import AuthManager
+from auth import get_auth_manager
+from cache import LRUCache
+from jose import JWTError
+from argon2.exceptions import HashingError
 
 # Load environment variables
 load_dotenv()
@@ -21,57 +34,141 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize database and auth with error handling
-try:
-    db = Database()
-    auth_manager = AuthManager()
-except Exception as e:
-    logger.error(f"Failed to initialize database or auth manager: {e}")
-    # Create dummy instances to prevent import errors
-    db = None
-    auth_manager = None
+# Initialize database and auth; a failure here should stop the import, not limp on
+db = get_db()
+auth_manager = get_auth_manager()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    # Startup
-    if db is not None:
-        try:
-            logger.info("Starting up application...")
-            await db.connect_to_postgres()
-            logger.info("Database connection established")
-        except Exception as e:
-            logger.error(f"Startup error: {str(e)}")
-            logger.warning("Application starting without database connection")
-            # Don't raise the error to allow the app to start even without DB
-    else:
-        logger.warning("Database not initialized, starting without database connection")
+    # Startup; without a database every page would fail, so refuse to start
+    logger.info("Starting up application...")
+    try:
+        await db.connect_to_postgres()
+    except Exception as e:
+        logger.error(f"Startup error: {str(e)}")
+        raise
+    logger.info("Database connection established")
     
     try:
         yield
     finally:
         # Shutdown
-        if db is not None:
+        try:
+            logger.info("Shutting down application...")
+            await db.close_postgres_connection()
+            logger.info("Database connection closed")
+        except Exception as e:
+            logger.error(f"Shutdown error: {str(e)}")
+
+# Pages behind the access_token cookie; everything else passes straight through
+COOKIE_AUTH_PATHS = frozenset({
+    "/dashboard", "/add-contribution", "/all-contributions", "/analytics",
+    "/profile", "/update-profile", "/monthly-contributions", "/transfers",
+    "/transfer", "/home", "/create-home", "/add-member", "/remove-member",
+    "/leave-home", "/request-join-home", "/approve-join-request",
+    "/join-requests/bulk",
+})
+COOKIE_AUTH_PREFIXES = ("/delete-contribution/",)
+
+# The access_token value inside a raw Cookie header; set_cookie quotes it because
+# of the space after Bearer, and some clients percent-encode that space instead
+_ACCESS_TOKEN_RE = re.compile(rb'(?:^|;)\s*access_token="?(?:Bearer(?: |%20))?([^";\s]*)')
+
+def _cookie_token(headers) -> Optional[str]:
+    """Pull the bearer token out of the raw access_token cookie"""
+    for name, value in headers:
+        if name == b"cookie":
+            match = _ACCESS_TOKEN_RE.search(value)
+            if match and match.group(1):
+                # Decoded only here, at the hand-off to the JWT library
+                return match.group(1).decode("latin-1")
+    return None
+
+# Adds a Server-Timing breakdown to join-request responses for profiling
+SERVER_TIMING = os.getenv("SERVER_TIMING") == "1"
+
+# Prebuilt pieces of the anonymous-path redirect, which is hot under unauthenticated
+# traffic; headers are copied per response since outer layers may append to the list
+_LOGIN_REDIRECT_HEADERS = ((b"location", b"/login"), (b"content-length", b"0"))
+_EMPTY_BODY = {"type": "http.response.body", "body": b""}
+
+class CookieAuthMiddleware:
+    """Pure ASGI guard for the cookie-authenticated pages.
+
+    Verifies the token straight from the raw headers and stores the username
+    in ``request.state.user_name``; anonymous or expired sessions go to /login.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+        if path not in COOKIE_AUTH_PATHS and not path.startswith(COOKIE_AUTH_PREFIXES):
+            return await self.app(scope, receive, send)
+        
+        user_name = None
+        token = _cookie_token(scope["headers"])
+        if token:
+            started = time.perf_counter()
             try:
-                logger.info("Shutting down application...")
-                await db.close_postgres_connection()
-                logger.info("Database connection closed")
-            except Exception as e:
-                logger.error(f"Shutdown error: {str(e)}")
+                user_name = auth_manager.verify_token(token).get("sub")
+            except JWTError:
+                pass
+            if SERVER_TIMING:
+                scope.setdefault("state", {})["jwt_ms"] = (time.perf_counter() - started) * 1000
+        if user_name is None:
+            await send({"type": "http.response.start", "status": 307, "headers": list(_LOGIN_REDIRECT_HEADERS)})
+            await send(_EMPTY_BODY)
+            return
+        
+        scope.setdefault("state", {})["user_name"] = user_name
+        await self.app(scope, receive, send)
+
+class ORJSONResponse(JSONResponse):
+    """JSON responses serialized with orjson instead of the stdlib encoder"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+# Comma-separated origins allowed to call /api and /token from another site
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()]
+CORS_PATHS = ("/api", "/token")
+
+class JSONCORSMiddleware:
+    """Runs Starlette's CORSMiddleware for the JSON endpoints and bypasses it elsewhere"""
+
+    def __init__(self, app, **options):
+        self.app = app
+        self.cors = CORSMiddleware(app, **options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(CORS_PATHS):
+            return await self.cors(scope, receive, send)
+        await self.app(scope, receive, send)
 
 app = FastAPI(
     title="House Finance Tracker", 
     description="Track house contributions and expenses",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allows all origins
-    allow_credentials=True,
-    allow_methods=["*"],  # Allows all methods
-    allow_headers=["*"],  # Allows all headers
-)
+# Registered before CORS so CORS stays the outermost layer
+app.add_middleware(CookieAuthMiddleware)
+
+# Only the JSON endpoints are meant for cross-origin callers; the cookie pages are
+# same-origin, so CORS is skipped for them and disabled entirely without CORS_ORIGINS
+if CORS_ORIGINS:
+    app.add_middleware(
+        JSONCORSMiddleware,
+        allow_origins=CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["GET", "POST"],
+        allow_headers=["Authorization", "Content-Type"],
+    )
 
 # Mount static files - use relative path for Vercel
 import os
@@ -82,10 +179,33 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 # Templates - use relative path for Vercel  
 templates_dir = os.path.join(project_root, "templates")
-templates = Jinja2Templates(directory=templates_dir)
+# Compiled templates persist in a temp-dir bytecode cache, so restarts and new workers
+# skip re-parsing; template files are only re-checked when ENVIRONMENT=development
+templates = Jinja2Templates(env=jinja2.Environment(
+    loader=jinja2.FileSystemLoader(templates_dir),
+    autoescape=jinja2.select_autoescape(["html"]),
+    auto_reload=os.getenv("ENVIRONMENT") == "development",
+    bytecode_cache=jinja2.FileSystemBytecodeCache(),
+    cache_size=400,
+))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+HEALTH_CACHE_SECONDS = 1
+_health_cache = LRUCache(maxsize=1, ttl=HEALTH_CACHE_SECONDS)
+
+# calendar.month_name runs strftime on every lookup, so resolve the names once
+MONTH_NAMES = tuple(calendar.month_name[1:])
+
+@lru_cache(maxsize=16)
+def recent_months(year: int, month: int) -> Tuple[Tuple[int, int, str], ...]:
+    """(year, month, name) for the twelve calendar months ending at year/month, newest first"""
+    months = []
+    for i in range(12):
+        y, m = divmod(year * 12 + month - 1 - i, 12)
+        months.append((y, m + 1, MONTH_NAMES[m]))
+    return tuple(months)
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -94,15 +214,31 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     )
     try:
         payload = auth_manager.verify_token(token)
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        user = await db.get_user(username)
-        if user is None:
-            raise credentials_exception
-        return user
-    except:
+    except JWTError:
         raise credentials_exception
+    username: str = payload.get("sub")
+    if username is None:
+        raise credentials_exception
+    user = await db.get_user(username)
+    if user is None:
+        raise credentials_exception
+    return user
+
+async def current_user_from_cookie(request: Request) -> User:
+    """The user CookieAuthMiddleware verified; their home is loaded in the same lookup"""
+    started = time.perf_counter()
+    user, user_home = await db.get_user_with_home(request.state.user_name)
+    if SERVER_TIMING:
+        request.state.user_ms = (time.perf_counter() - started) * 1000
+    if user is None:
+        # Deleted since the token was issued
+        raise HTTPException(status_code=status.HTTP_307_TEMPORARY_REDIRECT, headers={"Location": "/login"})
+    request.state.user_home = user_home
+    return user
+
+async def current_home_from_cookie(request: Request, user: User = Depends(current_user_from_cookie)) -> Optional[Home]:
+    """The authenticated user's home, or None; reuses the per-request user dependency"""
+    return request.state.user_home
 
 @app.get("/", response_class=HTMLResponse)
 async def dashboard(request: Request):
@@ -120,25 +256,23 @@ async def api_root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint for deployment"""
-    health_status = {"status": "healthy", "timestamp": datetime.now().isoformat()}
-    
-    if db is None:
-        health_status["database"] = "not_initialized"
-        health_status["status"] = "degraded"
-        health_status["message"] = "Database not initialized"
+    # Load balancers poll this several times a second; reuse the last probe briefly
+    health_status = _health_cache.get("health")
+    if health_status is not None:
         return health_status
     
+    health_status = {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    
     try:
-        # Test database connection
-        database = await db.get_database()
-        # Simple test query to check if database is accessible
-        await database.users.count_documents({})
+        # Test database connection with a trivial round trip
+        await db.ping()
         health_status["database"] = "connected"
     except Exception as e:
         health_status["database"] = "disconnected"
         health_status["database_error"] = str(e)
         health_status["status"] = "degraded"
     
+    _health_cache.set("health", health_status)
     return health_status
 
 @app.get("/login", response_class=HTMLResponse)
@@ -181,9 +315,10 @@ async def register(
         user = await db.create_user(user_create)
         logger.info(f"User {username} registered successfully")
         return RedirectResponse(url="/login?message=Registration successful", status_code=303)
-    except Exception as e:
-        # Log the error for debugging
-        logger.error(f"Registration error for {username}: {str(e)}", exc_info=True)
+    except ValueError as e:
+        # An invalid email fails UserCreate validation; a concurrent sign-up with
+        # the same username or email fails the insert
+        logger.warning(f"Registration failed for {username}: {str(e)}")
         return RedirectResponse(url="/register?error=Registration failed. Please try again.", status_code=303)
 
 @app.post("/token", response_model=Token)
@@ -195,11 +330,10 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30)))
-    access_token = auth_manager.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    access_token = auth_manager.create_access_token(data={"sub": user.username})
+    # Returning the response directly skips FastAPI's re-validation against
+    # response_model, which is kept only for the OpenAPI schema
+    return ORJSONResponse({"access_token": access_token, "token_type": "bearer"})
 
 @app.post("/login")
 async def login(
@@ -213,62 +347,48 @@ async def login(
             logger.warning(f"Login failed for username: {username}")
             return RedirectResponse(url="/login?error=Incorrect username or password", status_code=303)
         
-        access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30)))
-        access_token = auth_manager.create_access_token(
-            data={"sub": user.username}, expires_delta=access_token_expires
-        )
+        access_token = auth_manager.create_access_token(data={"sub": user.username})
         
         response = RedirectResponse(url="/dashboard", status_code=303)
         response.set_cookie(key="access_token", value=f"Bearer {access_token}", httponly=True)
         logger.info(f"Login successful for username: {username}")
         return response
-    except Exception as e:
+    except (asyncpg.PostgresError, HashingError) as e:
+        # The user lookup or the rehash-on-login update failed, or the upgraded hash could not be computed
         logger.error(f"Login error for {username}: {str(e)}", exc_info=True)
         return RedirectResponse(url="/login?error=Login failed. Please try again.", status_code=303)
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard_authenticated(request: Request):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
+async def dashboard_authenticated(
+    request: Request,
+    user: User = Depends(current_user_from_cookie),
+    user_home: Optional[Home] = Depends(current_home_from_cookie)
+):
+    # Contributions, balance and average stats are independent reads
+    contributions, user_balance, contribution_to_average = await asyncio.gather(
+        db.get_user_contributions(user.username),
+        db.get_user_balance(user.username),
+        db.get_contribution_to_average(user.username)
+    )
     
-    try:
-        # Remove 'Bearer ' prefix if present
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
-        # Get user's home (optional)
-        user_home = await db.get_user_home(user.username)
-        
-        # Get user's contributions
-        contributions = await db.get_user_contributions(user.username)
-        
-        # Get user's current balance
-        user_balance = await db.get_user_balance(user.username)
-        
-        # Get current month's summary (home-specific if user has home, otherwise empty)
-        current_month_summary = {}
-        if user_home:
-            from datetime import datetime
-            now = datetime.now()
-            current_month_summary = await db.get_home_monthly_summary(user_home.id, now.year, now.month)
-        
-        # Get contribution to average data
-        contribution_to_average = await db.get_contribution_to_average(user.username)
-        
-        return templates.TemplateResponse("dashboard.html", {
-            "request": request, 
-            "user": user,
-            "user_home": user_home,
-            "contributions": contributions,
-            "user_balance": user_balance,
-            "current_month_summary": current_month_summary,
-            "current_month_name": datetime.now().strftime("%B") if user_home else None,
-            "contribution_to_average": contribution_to_average
-        })
-    except:
-        return RedirectResponse(url="/login")
+    # Get current month's summary (home-specific if user has home, otherwise empty)
+    current_month_summary = {}
+    current_month_name = None
+    if user_home:
+        now = datetime.now()
+        current_month_summary = await db.get_home_monthly_summary(user_home.id, now.year, now.month, top_n=3)
+        current_month_name = MONTH_NAMES[now.month - 1]
+    
+    return templates.TemplateResponse("dashboard.html", {
+        "request": request, 
+        "user": user,
+        "user_home": user_home,
+        "contributions": contributions,
+        "user_balance": user_balance,
+        "current_month_summary": current_month_summary,
+        "current_month_name": current_month_name,
+        "contribution_to_average": contribution_to_average
+    })
 
 @app.post("/logout")
 async def logout():
@@ -279,406 +399,311 @@ async def logout():
 @app.post("/add-contribution")
 async def add_contribution(
     request: Request,
+    user: User = Depends(current_user_from_cookie),
+    user_home: Optional[Home] = Depends(current_home_from_cookie),
     product_name: str = Form(...),
     amount: float = Form(...),
     description: str = Form("")
 ):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
+    # Check if user belongs to a home
+    if not user_home:
+        return RedirectResponse(url="/dashboard?error=Please create or join a home to add contributions", status_code=303)
+    
+    contribution_data = {
+        "product_name": product_name,
+        "amount": amount,
+        "description": description
+    }
     
     try:
-        # Remove 'Bearer ' prefix if present
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
-        # Check if user belongs to a home
-        user_home = await db.get_user_home(user.username)
-        if not user_home:
-            return RedirectResponse(url="/dashboard?error=Please create or join a home to add contributions", status_code=303)
-        
-        contribution_data = {
-            "product_name": product_name,
-            "amount": amount,
-            "description": description
-        }
-        
         await db.create_contribution(user.username, contribution_data)
-        return RedirectResponse(url="/dashboard", status_code=303)
     except ValueError as e:
-        return RedirectResponse(url=f"/dashboard?error={str(e)}", status_code=303)
-    except:
-        return RedirectResponse(url="/login")
+        return RedirectResponse(url=f"/dashboard?error={quote(str(e))}", status_code=303)
+    return RedirectResponse(url="/dashboard", status_code=303)
 
 @app.get("/all-contributions", response_class=HTMLResponse)
-async def all_contributions(request: Request):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
+async def all_contributions(
+    request: Request,
+    user: User = Depends(current_user_from_cookie),
+    user_home: Optional[Home] = Depends(current_home_from_cookie)
+):
+    # Check if user belongs to a home
+    if not user_home:
+        return RedirectResponse(url="/dashboard?error=Please create or join a home to view contributions from your household", status_code=303)
     
-    try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
-        # Check if user belongs to a home
-        user_home = await db.get_user_home(user.username)
-        if not user_home:
-            return RedirectResponse(url="/dashboard?error=Please create or join a home to view contributions from your household", status_code=303)
-        
-        # Get home contributions with user details
-        home_contributions = await db.get_home_contributions_with_users(user_home.id)
-        
-        return templates.TemplateResponse("all_contributions.html", {
-            "request": request,
-            "user": user,
-            "user_home": user_home,
-            "contributions": home_contributions
-        })
-    except:
-        return RedirectResponse(url="/dashboard?error=Please create or join a home to view contributions", status_code=303)
+    # Get home contributions with user details
+    home_contributions = await db.get_home_contributions_with_users(user_home.id)
+    
+    return templates.TemplateResponse("all_contributions.html", {
+        "request": request,
+        "user": user,
+        "user_home": user_home,
+        "contributions": home_contributions
+    })
 
 @app.get("/analytics", response_class=HTMLResponse)
-async def analytics(request: Request):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
+async def analytics(
+    request: Request,
+    user: User = Depends(current_user_from_cookie),
+    user_home: Optional[Home] = Depends(current_home_from_cookie)
+):
+    # Check if user belongs to a home
+    if not user_home:
+        return RedirectResponse(url="/dashboard?error=Please create or join a home to view analytics for your household", status_code=303)
     
-    try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        
-        # Verify token and get user directly
-        payload = auth_manager.verify_token(token)
-        username = payload.get("sub")
-        if username is None:
-            return RedirectResponse(url="/login")
-        
-        user = await db.get_user(username)
-        if user is None:
-            return RedirectResponse(url="/login")
-        
-        # Check if user belongs to a home
-        user_home = await db.get_user_home(user.username)
-        if not user_home:
-            return RedirectResponse(url="/dashboard?error=Please create or join a home to view analytics for your household", status_code=303)
-        
-        # Get home-specific analytics data
-        analytics_data = await db.get_home_analytics(user_home.id)
-        
-        return templates.TemplateResponse("analytics.html", {
-            "request": request,
-            "user": user,
-            "user_home": user_home,
-            "analytics": analytics_data
-        })
-    except:
-        return RedirectResponse(url="/dashboard?error=Please create or join a home to view analytics", status_code=303)
+    # Get home-specific analytics data
+    analytics_data = await db.get_home_analytics(user_home.id)
+    
+    return templates.TemplateResponse("analytics.html", {
+        "request": request,
+        "user": user,
+        "user_home": user_home,
+        "analytics": analytics_data
+    })
 
 @app.post("/delete-contribution/{contribution_id}")
 async def delete_contribution(request: Request, contribution_id: str):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
-    
+    # Only allow users to delete their own contributions
     try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
-        # Only allow users to delete their own contributions
-        success = await db.delete_contribution(contribution_id, user.username)
-        if not success:
-            raise HTTPException(status_code=403, detail="Not authorized to delete this contribution")
-        
-        return RedirectResponse(url="/dashboard", status_code=303)
-    except:
+        success = await db.delete_contribution(contribution_id, request.state.user_name)
+    except ValueError:
+        # Not a numeric id, so it cannot name one of their contributions
+        success = False
+    if not success:
         return RedirectResponse(url="/login")
+    
+    return RedirectResponse(url="/dashboard", status_code=303)
 
 @app.get("/profile", response_class=HTMLResponse)
-async def profile(request: Request):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
+async def profile(
+    request: Request,
+    user: User = Depends(current_user_from_cookie)
+):
+    # Get user statistics
+    user_stats = await db.get_user_statistics(user.username)
     
-    try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
-        # Get user statistics
-        user_stats = await db.get_user_statistics(user.username)
-        
-        return templates.TemplateResponse("profile.html", {
-            "request": request,
-            "user": user,
-            "stats": user_stats
-        })
-    except:
-        return RedirectResponse(url="/login")
+    return templates.TemplateResponse("profile.html", {
+        "request": request,
+        "user": user,
+        "stats": user_stats
+    })
 
 @app.post("/update-profile")
 async def update_profile(
     request: Request,
+    user: User = Depends(current_user_from_cookie),
     full_name: str = Form(...),
     email: str = Form(...)
 ):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
-    
+    # Update user profile
     try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
-        # Update user profile
-        await db.update_user_profile(user.username, full_name, email)
-        
-        return RedirectResponse(url="/profile?message=Profile updated successfully", status_code=303)
-    except:
+        updated = await db.update_user_profile(user.username, full_name, email)
+    except asyncpg.UniqueViolationError:
+        return RedirectResponse(url="/profile?error=Email already registered", status_code=303)
+    if updated is None:
         return RedirectResponse(url="/login")
+    
+    return RedirectResponse(url="/profile?message=Profile updated successfully", status_code=303)
 
 @app.get("/monthly-contributions", response_class=HTMLResponse)
-async def monthly_contributions(request: Request, year: int = None, month: int = None):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
+async def monthly_contributions(
+    request: Request,
+    year: int = None,
+    month: int = None,
+    user: User = Depends(current_user_from_cookie),
+    user_home: Optional[Home] = Depends(current_home_from_cookie)
+):
+    # Check if user belongs to a home
+    if not user_home:
+        return RedirectResponse(url="/dashboard?error=Please create or join a home to view monthly contributions for your household", status_code=303)
     
-    try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
-        # Check if user belongs to a home
-        user_home = await db.get_user_home(user.username)
-        if not user_home:
-            return RedirectResponse(url="/dashboard?error=Please create or join a home to view monthly contributions for your household", status_code=303)
-        
-        # Get current date if no year/month specified
-        if not year or not month:
-            from datetime import datetime
-            now = datetime.now()
-            year = year or now.year
-            month = month or now.month
-        
-        # Get monthly contributions and summary for the home
-        contributions = await db.get_home_monthly_contributions(user_home.id, year, month)
-        monthly_summary = await db.get_home_monthly_summary(user_home.id, year, month)
-        
-        # Get available months (last 12 months)
-        available_months = []
-        from datetime import datetime, timedelta
-        current_date = datetime.now()
-        for i in range(12):
-            date = current_date - timedelta(days=30*i)
-            available_months.append({
-                "year": date.year,
-                "month": date.month,
-                "month_name": date.strftime("%B"),
-                "is_current": date.year == year and date.month == month
-            })
-        
-        return templates.TemplateResponse("monthly_contributions.html", {
-            "request": request,
-            "user": user,
-            "user_home": user_home,
-            "contributions": contributions,
-            "monthly_summary": monthly_summary,
-            "available_months": available_months,
-            "current_year": year,
-            "current_month": month,
-            "month_name": datetime(year, month, 1).strftime("%B")
-        })
-    except:
-        return RedirectResponse(url="/dashboard?error=Please create or join a home to view monthly contributions", status_code=303)
+    # Get current date if no year/month specified
+    now = datetime.now()
+    year = year or now.year
+    month = month or now.month
+    
+    # Reject an out-of-range year or month before it reaches a query
+    if not (1 <= month <= 12 and MINYEAR <= year < MAXYEAR):
+        return RedirectResponse(url="/dashboard?error=Invalid month selected", status_code=303)
+    month_name = MONTH_NAMES[month - 1]
+    
+    # Get monthly contributions and summary for the home; the two reads are independent
+    contributions, monthly_summary = await asyncio.gather(
+        db.get_home_monthly_contributions(user_home.id, year, month),
+        db.get_home_monthly_summary(user_home.id, year, month)
+    )
+    
+    # Get available months (last 12 months); only is_current depends on the request
+    available_months = [
+        {"year": y, "month": m, "month_name": name, "is_current": y == year and m == month}
+        for y, m, name in recent_months(now.year, now.month)
+    ]
+    
+    return templates.TemplateResponse("monthly_contributions.html", {
+        "request": request,
+        "user": user,
+        "user_home": user_home,
+        "contributions": contributions,
+        "monthly_summary": monthly_summary,
+        "available_months": available_months,
+        "current_year": year,
+        "current_month": month,
+        "month_name": month_name
+    })
 
 @app.get("/transfers", response_class=HTMLResponse)
-async def transfers_page(request: Request):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
+async def transfers_page(
+    request: Request,
+    user: User = Depends(current_user_from_cookie),
+    user_home: Optional[Home] = Depends(current_home_from_cookie)
+):
+    logger.info(f"User authenticated: {user.username}")
+    logger.info(f"User home: {user_home.name if user_home else 'None'}")
     
-    try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        logger.info(f"User authenticated: {user.username}")
-        
-        # Check if user belongs to a home
-        try:
-            user_home = await db.get_user_home(user.username)
-            logger.info(f"User home: {user_home.name if user_home else 'None'}")
-        except Exception as e:
-            logger.error(f"Error getting user home: {str(e)}")
-            user_home = None
-            
-        if not user_home:
-            return templates.TemplateResponse("transfers.html", {
-                "request": request,
-                "user": user,
-                "user_home": None,
-                "transfers": {"sent": [], "received": []},
-                "balance": 0,
-                "available_users": [],
-                "contribution_stats": None,
-                "can_transfer": False,
-                "no_home_message": "Please create or join a home to transfer money with your household members."
-            })
-        
-        # Get user's transfers
-        try:
-            transfers = await db.get_user_transfers(user.username)
-            logger.info(f"Transfers retrieved: {len(transfers.get('sent', []))} sent, {len(transfers.get('received', []))} received")
-        except Exception as e:
-            logger.error(f"Error getting user transfers: {str(e)}")
-            transfers = {"sent": [], "received": []}
-        
-        # Get user's current balance (total contributions)
-        try:
-            balance = await db.get_user_balance(user.username)
-            logger.info(f"User balance: {balance}")
-        except Exception as e:
-            logger.error(f"Error getting user balance: {str(e)}")
-            balance = 0
-        
-        # Get user's contribution statistics for display
-        try:
-            contribution_stats = await db.get_contribution_to_average(user.username)
-            logger.info(f"Contribution stats retrieved: {contribution_stats}")
-        except Exception as e:
-            logger.error(f"Error getting contribution stats: {str(e)}")
-            contribution_stats = {
-                "user_total": 0,
-                "average_contribution": 0,
-                "amount_to_reach_average": 0,
-                "is_above_average": False,
-                "home_members_count": 0
-            }
-        
-        # Anyone in a home can make transfers to other home members
-        can_transfer = user_home is not None
-        
-        # Get eligible recipients (all home members except sender)
-        eligible_recipients = []
-        if can_transfer:
-            try:
-                eligible_recipients = await db.get_eligible_transfer_recipients(user.username)
-                logger.info(f"Eligible recipients: {len(eligible_recipients)}")
-            except Exception as e:
-                logger.error(f"Error getting eligible recipients: {str(e)}")
-                eligible_recipients = []
-        
+    if not user_home:
         return templates.TemplateResponse("transfers.html", {
             "request": request,
             "user": user,
-            "user_home": user_home,
-            "transfers": transfers,
-            "balance": balance,
-            "available_users": eligible_recipients,
-            "contribution_stats": contribution_stats,
-            "can_transfer": can_transfer
+            "user_home": None,
+            "transfers": {"sent": [], "received": []},
+            "balance": 0,
+            "available_users": [],
+            "contribution_stats": None,
+            "can_transfer": False,
+            "no_home_message": "Please create or join a home to transfer money with your household members."
         })
-    except Exception as e:
-        logger.error(f"Error in transfers page for user {user.username if 'user' in locals() else 'unknown'}: {str(e)}", exc_info=True)
-        return RedirectResponse(url="/login")
+    
+    # Transfers, balance, stats and recipients are independent reads; each
+    # failure falls back to its own default below
+    transfers, balance, contribution_stats, eligible_recipients = await asyncio.gather(
+        db.get_user_transfers(user.username),
+        db.get_user_balance(user.username),
+        db.get_contribution_to_average(user.username),
+        db.get_eligible_transfer_recipients(user.username),
+        return_exceptions=True
+    )
+    
+    # Get user's transfers
+    if isinstance(transfers, Exception):
+        logger.error(f"Error getting user transfers: {str(transfers)}")
+        transfers = {"sent": [], "received": []}
+    else:
+        logger.info(f"Transfers retrieved: {len(transfers.get('sent', []))} sent, {len(transfers.get('received', []))} received")
+    
+    # Get user's current balance (total contributions)
+    if isinstance(balance, Exception):
+        logger.error(f"Error getting user balance: {str(balance)}")
+        balance = 0
+    else:
+        logger.info(f"User balance: {balance}")
+    
+    # Get user's contribution statistics for display
+    if isinstance(contribution_stats, Exception):
+        logger.error(f"Error getting contribution stats: {str(contribution_stats)}")
+        contribution_stats = {
+            "user_total": 0,
+            "average_contribution": 0,
+            "amount_to_reach_average": 0,
+            "is_above_average": False,
+            "home_members_count": 0
+        }
+    else:
+        logger.info(f"Contribution stats retrieved: {contribution_stats}")
+    
+    # Anyone in a home can make transfers to other home members
+    can_transfer = user_home is not None
+    
+    # Get eligible recipients (all home members except sender)
+    if isinstance(eligible_recipients, Exception):
+        logger.error(f"Error getting eligible recipients: {str(eligible_recipients)}")
+        eligible_recipients = []
+    else:
+        logger.info(f"Eligible recipients: {len(eligible_recipients)}")
+    
+    return templates.TemplateResponse("transfers.html", {
+        "request": request,
+        "user": user,
+        "user_home": user_home,
+        "transfers": transfers,
+        "balance": balance,
+        "available_users": eligible_recipients,
+        "contribution_stats": contribution_stats,
+        "can_transfer": can_transfer
+    })
 
 @app.post("/transfer")
 async def create_transfer(
     request: Request,
+    user: User = Depends(current_user_from_cookie),
+    user_home: Optional[Home] = Depends(current_home_from_cookie),
     recipient_username: str = Form(...),
     amount: float = Form(...),
     description: str = Form("")
 ):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
+    # Check if user belongs to a home
+    if not user_home:
+        return RedirectResponse(url="/transfers?error=Please create or join a home to transfer money", status_code=303)
+    
+    # Validate amount
+    if amount <= 0:
+        return RedirectResponse(url="/transfers?error=Transfer amount must be positive", status_code=303)
+    
+    transfer_data = TransferCreate(
+        recipient_username=recipient_username,
+        amount=amount,
+        description=description
+    )
     
     try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
-        # Check if user belongs to a home
-        user_home = await db.get_user_home(user.username)
-        if not user_home:
-            return RedirectResponse(url="/transfers?error=Please create or join a home to transfer money", status_code=303)
-        
-        # Validate amount
-        if amount <= 0:
-            return RedirectResponse(url="/transfers?error=Transfer amount must be positive", status_code=303)
-        
-        transfer_data = TransferCreate(
-            recipient_username=recipient_username,
-            amount=amount,
-            description=description
-        )
-        
-        try:
-            await db.create_transfer(user.username, transfer_data)
-            return RedirectResponse(url="/transfers?message=Fund transfer completed successfully - contributions adjusted", status_code=303)
-        except ValueError as e:
-            return RedirectResponse(url=f"/transfers?error={str(e)}", status_code=303)
-        
-    except:
-        return RedirectResponse(url="/login")
+        await db.create_transfer(user.username, transfer_data)
+        return RedirectResponse(url="/transfers?message=Fund transfer completed successfully - contributions adjusted", status_code=303)
+    except ValueError as e:
+        return RedirectResponse(url=f"/transfers?error={quote(str(e))}", status_code=303)
 
 @app.get("/home", response_class=HTMLResponse)
-async def home_management(request: Request):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
+async def home_management(
+    request: Request,
+    user: User = Depends(current_user_from_cookie),
+    user_home: Optional[Home] = Depends(current_home_from_cookie)
+):
+    # Get home members if user belongs to a home
+    home_members = []
+    pending_requests = []
+    user_pending_request = None
     
-    try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
-        # Get user's home
-        user_home = await db.get_user_home(user.username)
-        
-        # Get home members if user belongs to a home
-        home_members = []
-        pending_requests = []
-        user_pending_request = None
-        
-        if user_home:
-            home_members = await db.get_home_members(user_home.id)
-            # Get pending join requests if user is leader
-            if user_home.leader_username == user.username:
-                pending_requests = await db.get_pending_join_requests(user_home.id)
+    if user_home:
+        # Get pending join requests if user is leader, alongside the members
+        if user_home.leader_username == user.username:
+            home_members, pending_requests = await asyncio.gather(
+                db.get_home_members(user_home.id),
+                db.get_pending_join_requests(user_home.id)
+            )
         else:
-            # Check if user has a pending join request
-            user_pending_request = await db.get_user_pending_request(user.username)
-        
-        return templates.TemplateResponse("home_management.html", {
-            "request": request,
-            "user": user,
-            "user_home": user_home,
-            "home_members": home_members,
-            "pending_requests": pending_requests,
-            "user_pending_request": user_pending_request,
-            "is_leader": user_home and user_home.leader_username == user.username
-        })
-    except:
-        return RedirectResponse(url="/login")
+            home_members = await db.get_home_members(user_home.id)
+    else:
+        # Check if user has a pending join request
+        user_pending_request = await db.get_user_pending_request(user.username)
+    
+    return templates.TemplateResponse("home_management.html", {
+        "request": request,
+        "user": user,
+        "user_home": user_home,
+        "home_members": home_members,
+        "pending_requests": pending_requests,
+        "user_pending_request": user_pending_request,
+        "is_leader": user_home and user_home.leader_username == user.username,
+        # One key per render; approve/reject treat a repeat of the same form as a retry
+        "idempotency_key": secrets.token_urlsafe(16)
+    })
 
 @app.post("/create-home")
 async def create_home(
     request: Request,
+    user: User = Depends(current_user_from_cookie),
     name: str = Form(...),
     description: str = Form("")
 ):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
-    
     try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
         # Check if user is already in a home
         if user.home_id:
             return RedirectResponse(url="/home?error=You are already in a home", status_code=303)
@@ -687,137 +712,141 @@ async def create_home(
         await db.create_home(home_data, user.username)
         
         return RedirectResponse(url="/home?message=Home created successfully", status_code=303)
-    except Exception as e:
-        return RedirectResponse(url=f"/home?error={str(e)}", status_code=303)
+    except ValueError as e:
+        return RedirectResponse(url=f"/home?error={quote(str(e))}", status_code=303)
 
 @app.post("/add-member")
 async def add_member_to_home(
     request: Request,
+    user: User = Depends(current_user_from_cookie),
     username: str = Form(...)
 ):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
+    if not user.home_id:
+        return RedirectResponse(url="/home?error=You must be in a home to add members", status_code=303)
     
-    try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
-        if not user.home_id:
-            return RedirectResponse(url="/home?error=You must be in a home to add members", status_code=303)
-        
-        success = await db.add_member_to_home(user.home_id, username, user.username)
-        if success:
-            return RedirectResponse(url="/home?message=Member added successfully", status_code=303)
-        else:
-            return RedirectResponse(url="/home?error=Failed to add member. Check if user exists and is not already in a home.", status_code=303)
-    except:
-        return RedirectResponse(url="/login")
+    success = await db.add_member_to_home(user.home_id, username, user.username)
+    if success:
+        return RedirectResponse(url="/home?message=Member added successfully", status_code=303)
+    else:
+        return RedirectResponse(url="/home?error=Failed to add member. Check if user exists and is not already in a home.", status_code=303)
 
 @app.post("/remove-member")
 async def remove_member_from_home(
     request: Request,
+    user: User = Depends(current_user_from_cookie),
     username: str = Form(...)
 ):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
+    if not user.home_id:
+        return RedirectResponse(url="/home?error=You must be in a home to remove members", status_code=303)
     
-    try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
-        if not user.home_id:
-            return RedirectResponse(url="/home?error=You must be in a home to remove members", status_code=303)
-        
-        success = await db.remove_member_from_home(user.home_id, username, user.username)
-        if success:
-            return RedirectResponse(url="/home?message=Member removed successfully", status_code=303)
-        else:
-            return RedirectResponse(url="/home?error=Failed to remove member. Only leaders can remove members.", status_code=303)
-    except:
-        return RedirectResponse(url="/login")
+    success = await db.remove_member_from_home(user.home_id, username, user.username)
+    if success:
+        return RedirectResponse(url="/home?message=Member removed successfully", status_code=303)
+    else:
+        return RedirectResponse(url="/home?error=Failed to remove member. Only leaders can remove members.", status_code=303)
 
 @app.post("/leave-home")
 async def leave_home(request: Request):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
-    
-    try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
-        success = await db.leave_home(user.username)
-        if success:
-            return RedirectResponse(url="/home?message=Left home successfully", status_code=303)
-        else:
-            return RedirectResponse(url="/home?error=Cannot leave home. Leaders cannot leave unless they are the only member.", status_code=303)
-    except:
-        return RedirectResponse(url="/login")
+    success = await db.leave_home(request.state.user_name)
+    if success:
+        return RedirectResponse(url="/home?message=Left home successfully", status_code=303)
+    else:
+        return RedirectResponse(url="/home?error=Cannot leave home. Leaders cannot leave unless they are the only member.", status_code=303)
 
 @app.post("/request-join-home")
 async def request_join_home(
     request: Request,
+    user: User = Depends(current_user_from_cookie),
     home_name: str = Form(...)
 ):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
+    # Check if user is already in a home
+    if user.home_id:
+        return RedirectResponse(url="/home?error=You are already in a home", status_code=303)
     
-    try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
-        # Check if user is already in a home
-        if user.home_id:
-            return RedirectResponse(url="/home?error=You are already in a home", status_code=303)
-        
-        # Create join request
-        success = await db.create_join_request(user.username, home_name)
-        if success:
-            return RedirectResponse(url="/home?message=Join request sent successfully. Wait for leader approval.", status_code=303)
-        else:
-            return RedirectResponse(url="/home?error=Failed to send join request. Check if home exists or if you already have a pending request.", status_code=303)
-    except Exception as e:
-        return RedirectResponse(url=f"/home?error={str(e)}", status_code=303)
+    # Create join request
+    success = await db.create_join_request(user.username, home_name)
+    if success:
+        return RedirectResponse(url="/home?message=Join request sent successfully. Wait for leader approval.", status_code=303)
+    else:
+        return RedirectResponse(url="/home?error=Failed to send join request. Check if home exists or if you already have a pending request.", status_code=303)
+
+# The approve/reject outcomes never change, so their redirect URLs are quoted once
+_INVALID_ACTION_URL = "/home?error=" + quote("Invalid action")
+_JOIN_REQUEST_REDIRECTS = {
+    ("approve", True): "/home?message=" + quote("Join request approved successfully"),
+    ("approve", False): "/home?error=" + quote("Failed to approve join request"),
+    ("reject", True): "/home?message=" + quote("Join request rejected successfully"),
+    ("reject", False): "/home?error=" + quote("Failed to reject join request"),
+}
+# Recent successful approve/reject posts, so a double-click or retried fetch
+# answers from memory instead of reporting the already-processed request as failed;
+# failures are not kept, so resubmitting the same form retries them
+_join_request_outcomes = LRUCache(maxsize=10_000, ttl=600)
 
 @app.post("/approve-join-request")
 async def approve_join_request(
     request: Request,
+    user: User = Depends(current_user_from_cookie),
     request_id: str = Form(...),
-    action: str = Form(...)  
+    action: str = Form(...),
+    idempotency_key: Optional[str] = Form(None)
 ):
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/login")
+    # The home page posts here with fetch and drops the row itself on a 204;
+    # plain form posts still get the redirect back to /home
+    from_fetch = request.headers.get("x-requested-with") == "fetch"
+    if action not in ("approve", "reject"):
+        if from_fetch:
+            return Response(status_code=400)
+        return RedirectResponse(url=_INVALID_ACTION_URL, status_code=303)
     
-    try:
-        if token.startswith("Bearer "):
-            token = token[7:]
-        user = await get_current_user(token)
-        
+    outcome_key = (user.username, request_id, action, idempotency_key)
+    success = _join_request_outcomes.get(outcome_key) if idempotency_key else None
+    started = time.perf_counter()
+    if success is None:
         if action == "approve":
             success = await db.approve_join_request(request_id, user.username)
-            message = "Join request approved successfully" if success else "Failed to approve join request"
-        elif action == "reject":
-            success = await db.reject_join_request(request_id, user.username)
-            message = "Join request rejected successfully" if success else "Failed to reject join request"
         else:
-            return RedirectResponse(url="/home?error=Invalid action", status_code=303)
-        
-        if success:
-            return RedirectResponse(url=f"/home?message={message}", status_code=303)
-        else:
-            return RedirectResponse(url=f"/home?error={message}", status_code=303)
-    except Exception as e:
-        return RedirectResponse(url=f"/home?error={str(e)}", status_code=303)
+            success = await db.reject_join_request(request_id, user.username)
+        if success and idempotency_key:
+            _join_request_outcomes.set(outcome_key, success)
+    db_ms = (time.perf_counter() - started) * 1000
+    
+    if from_fetch:
+        response = Response(status_code=204 if success else 400)
+    else:
+        response = RedirectResponse(url=_JOIN_REQUEST_REDIRECTS[action, success], status_code=303)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = (
+            f"jwt;dur={request.state.jwt_ms:.1f}, user;dur={request.state.user_ms:.1f}, db;dur={db_ms:.1f}"
+        )
+    return response
+
+@app.post("/join-requests/bulk")
+async def bulk_join_requests(
+    request: Request,
+    user: User = Depends(current_user_from_cookie),
+    request_ids: List[str] = Form([]),
+    action: str = Form(...)
+):
+    if action not in ("approve", "reject"):
+        return RedirectResponse(url=_INVALID_ACTION_URL, status_code=303)
+    if not request_ids:
+        return RedirectResponse(url="/home?error=No join requests selected", status_code=303)
+    
+    if action == "approve":
+        processed = await db.approve_join_requests(request_ids, user.username)
+        verb = "approved"
+    else:
+        processed = await db.reject_join_requests(request_ids, user.username)
+        verb = "rejected"
+    
+    if not processed:
+        return RedirectResponse(url="/home?error=No join requests were processed", status_code=303)
+    return RedirectResponse(url=f"/home?message={processed} join request(s) {verb}", status_code=303)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # "auto" picks uvloop and httptools whenever uvicorn[standard] installed them,
+    # and still falls back to asyncio on platforms uvloop does not support
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="auto", http="auto")
 
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -12,13 +12,8 @@ class HomeCreate(HomeBase):
 class Home(HomeBase):
     id: Optional[str] = None
     leader_username: str
-    members: List[str] = []
-    date_created: datetime = datetime.now()
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    members: List[str] = Field(default_factory=list)
+    date_created: datetime = Field(default_factory=datetime.utcnow)
 
 class UserBase(BaseModel):
     username: str
@@ -39,14 +34,19 @@ class User(UserBase):
 class UserInDB(User):
     hashed_password: str
 
+# Request/response DTOs are never changed after validation, so they are frozen;
+# UserInDB and the other records stay mutable
 class Token(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='ignore')
     access_token: str
     token_type: str
 
 class TokenData(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='ignore')
     username: Optional[str] = None
 
 class ContributionCreate(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='ignore')
     product_name: str
     amount: float
     description: Optional[str] = None
@@ -58,14 +58,10 @@ class Contribution(BaseModel):
     product_name: str
     amount: float
     description: Optional[str] = None
-    date_created: datetime = datetime.now()
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    date_created: datetime = Field(default_factory=datetime.utcnow)
 
 class TransferCreate(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='ignore')
     recipient_username: str
     amount: float
     description: Optional[str] = None
@@ -77,9 +73,7 @@ class Transfer(BaseModel):
     home_id: str
     amount: float
     description: Optional[str] = None
-    date_created: datetime = datetime.now()
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    date_created: datetime = Field(default_factory=datetime.utcnow)
+    # Counterparty names, filled in when transfers are listed for a user
+    sender_full_name: Optional[str] = None
+    recipient_full_name: Optional[str] = None